@@ -0,0 +1,52 @@
+import queue
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+class AsyncBatchDriver:
+    def __init__(self, read_func, pool, prefetch=4):
+        self.read_func = read_func
+        self.pool = pool
+        self.prefetch = max(1, prefetch)
+
+    async def _read(self, input_path, feed):
+        loop = asyncio.get_running_loop()
+        try:
+            input_data = await loop.run_in_executor(self.io_executor, self.read_func, input_path)
+        except OSError:
+            input_data = None
+        feed.put((input_path, input_data))
+
+    async def _prefetch(self, tasks, feed):
+        reads = []
+        for input_path in tasks:
+            await self.read_slots.acquire()
+            reads.append(asyncio.create_task(self._read(input_path, feed)))
+        await asyncio.gather(*reads)
+        feed.put(None)
+
+    async def _run(self, tasks, on_result):
+        loop = asyncio.get_running_loop()
+        self.read_slots = asyncio.Semaphore(self.prefetch)
+
+        def release_read_slot():
+            loop.call_soon_threadsafe(self.read_slots.release)
+
+        feed = queue.SimpleQueue()
+        producer = asyncio.create_task(self._prefetch(tasks, feed))
+        try:
+            await loop.run_in_executor(
+                self.supervisor_executor, self.pool.run_feed, feed, on_result, release_read_slot
+            )
+        except BaseException:
+            producer.cancel()
+            raise
+        await producer
+
+    def run(self, tasks, on_result):
+        self.io_executor = ThreadPoolExecutor(self.prefetch)
+        self.supervisor_executor = ThreadPoolExecutor(1)
+        try:
+            asyncio.run(self._run(list(tasks), on_result))
+        finally:
+            self.io_executor.shutdown()
+            self.supervisor_executor.shutdown()
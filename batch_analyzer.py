@@ -0,0 +1,221 @@
+import os
+import json
+import numpy as np
+from PIL import Image
+
+from compiled_presets import get_compiled_preset
+from image_processor import (
+    get_image_processor,
+    shrink_for_analysis,
+    classify_level,
+    valid_pixel_mask,
+    compute_laplacian_variance,
+    compute_histogram_contrast,
+)
+from progress_journal import ProgressJournal
+from utils import format_time, format_file_size
+
+LEVELS = ("低", "中", "高")
+
+def load_analysis_thumbnail(image_path, thumbnail_size):
+    with Image.open(image_path) as image:
+        original_size = image.size
+        thumbnail = shrink_for_analysis(image, thumbnail_size)
+        gray = np.asarray(thumbnail.convert("L"), dtype=np.float32)
+        rgb = np.asarray(thumbnail.convert("RGB"))
+    return gray, rgb, original_size
+
+def count_colors(rgb, sizes, color_bits=4):
+    quantized = (rgb >> (8 - color_bits)).astype(np.int64)
+    codes = (quantized[..., 0] << (2 * color_bits)) | (quantized[..., 1] << color_bits) | quantized[..., 2]
+    bins = 1 << (3 * color_bits)
+    codes[~valid_pixel_mask(sizes, codes.shape[1:])] = bins
+    codes = codes.reshape(len(codes), -1) + np.arange(len(codes))[:, None] * (bins + 1)
+    histogram = np.bincount(codes.ravel(), minlength=len(codes) * (bins + 1)).reshape(-1, bins + 1)[:, :bins]
+    return np.count_nonzero(histogram, axis=1)
+
+def analyze_thumbnails(thumbnails, analysis_config):
+    thumbnail_size = analysis_config["thumbnail_size"]
+    gray = np.zeros((len(thumbnails), thumbnail_size, thumbnail_size), dtype=np.float32)
+    rgb = np.zeros((len(thumbnails), thumbnail_size, thumbnail_size, 3), dtype=np.uint8)
+    sizes = np.zeros((len(thumbnails), 2), dtype=np.int64)
+    original_pixels = np.zeros(len(thumbnails), dtype=np.float64)
+    for index, (_, thumbnail_gray, thumbnail_rgb, original_size) in enumerate(thumbnails):
+        height, width = thumbnail_gray.shape
+        gray[index, :height, :width] = thumbnail_gray
+        rgb[index, :height, :width] = thumbnail_rgb
+        sizes[index] = (width, height)
+        original_pixels[index] = original_size[0] * original_size[1]
+
+    sharpness = compute_laplacian_variance(gray, sizes)
+    contrast = compute_histogram_contrast(gray, original_pixels, sizes)
+    colors = count_colors(rgb, sizes, analysis_config["color_bits"])
+
+    records = []
+    for index, (image_path, _, _, original_size) in enumerate(thumbnails):
+        records.append({
+            "input_path": str(image_path),
+            "size": original_size,
+            "file_size": os.path.getsize(image_path),
+            "sharpness": float(sharpness[index]),
+            "blur_level": classify_level(sharpness[index], analysis_config["blur_thresholds"]),
+            "contrast": float(contrast[index]),
+            "contrast_level": classify_level(contrast[index], analysis_config["contrast_thresholds"]),
+            "colors": int(colors[index]),
+            "color_level": classify_level(colors[index], analysis_config["color_thresholds"]),
+        })
+    return records
+
+def analyze_directory(image_files, analysis_config, verbose=True):
+    batch_size = analysis_config["batch_size"]
+    records = []
+
+    for start in range(0, len(image_files), batch_size):
+        thumbnails = []
+        for image_path in image_files[start:start + batch_size]:
+            try:
+                thumbnails.append((image_path, *load_analysis_thumbnail(image_path, analysis_config["thumbnail_size"])))
+            except (OSError, ValueError) as e:
+                if verbose:
+                    print(f"  警告: 画像を読み込めません: {os.path.basename(str(image_path))} - {str(e)}")
+        if thumbnails:
+            records.extend(analyze_thumbnails(thumbnails, analysis_config))
+
+        if verbose:
+            print(f"  分析中: {min(start + batch_size, len(image_files))}/{len(image_files)}")
+
+    return records
+
+def load_measured_costs(journal_path, preset_names):
+    journal = ProgressJournal(journal_path)
+    journal.load()
+
+    totals = {name: [0.0, 0.0] for name in preset_names}
+    for entry in journal.entries.values():
+        preset_name = entry.get("quality_preset")
+        if entry["status"] != "success" or preset_name not in totals or not entry.get("image_size"):
+            continue
+        preset = get_compiled_preset(preset_name)
+        if entry.get("preset_key") != preset.cache_key:
+            continue
+        totals[preset_name][0] += entry["elapsed"]
+        totals[preset_name][1] += get_image_processor(preset).estimate_processing_cost(entry["image_size"])
+
+    return {name: measured / cost for name, (measured, cost) in totals.items() if cost > 0}
+
+def estimate_time(preset_name, image_size, cost_factors):
+    if preset_name not in cost_factors:
+        return None
+    cost = get_image_processor(get_compiled_preset(preset_name)).estimate_processing_cost(image_size)
+    return cost * cost_factors[preset_name]
+
+def sum_estimates(estimates):
+    estimates = list(estimates)
+    if any(estimate is None for estimate in estimates):
+        return None
+    return sum(estimates)
+
+def format_estimate(seconds):
+    return format_time(seconds) if seconds is not None else "不明"
+
+def recommend_preset(record, analysis_config, cost_factors):
+    candidates = analysis_config["candidate_presets"]
+    index = min(LEVELS.index(record["color_level"]), len(candidates) - 1)
+    reasons = [f"色数{record['color_level']}"]
+
+    if record["blur_level"] == "低" and index > 0:
+        index -= 1
+        reasons.append("ぼけが大きい")
+
+    if record["contrast_level"] == "低":
+        for candidate_index in range(index, len(candidates)):
+            if get_compiled_preset(candidates[candidate_index]).preprocessing.contrast_enhancement:
+                index = candidate_index
+                reasons.append("低コントラスト")
+                break
+
+    while index > 0:
+        preset = get_compiled_preset(candidates[index])
+        estimated = estimate_time(candidates[index], record["size"], cost_factors)
+        if not preset.limits.timeout or estimated is None or estimated <= preset.limits.timeout:
+            break
+        index -= 1
+        reasons.append("処理時間超過")
+
+    return {
+        "preset": candidates[index],
+        "estimated_time": estimate_time(candidates[index], record["size"], cost_factors),
+        "reasons": reasons,
+    }
+
+def _print_distribution(label, values, formatter):
+    low, median, high_percentile, high = np.percentile(values, [0, 50, 90, 100])
+    print(f"  {label:<10} {formatter(low):>10} {formatter(median):>10} {formatter(high_percentile):>10} {formatter(high):>10}")
+
+def print_analysis_report(records, analysis_config, cost_factors, verbose=False):
+    print("\n" + "=" * 50)
+    print(f"画質分析レポート: {len(records)}枚")
+    print("=" * 50)
+
+    print(f"  {'指標':<10} {'最小':>10} {'中央値':>10} {'90%':>10} {'最大':>10}")
+    _print_distribution("シャープネス", [record["sharpness"] for record in records], lambda value: f"{value:.1f}")
+    _print_distribution("コントラスト", [record["contrast"] for record in records], lambda value: f"{value:.1f}")
+    _print_distribution("色数", [record["colors"] for record in records], lambda value: f"{value:.0f}")
+    _print_distribution("画素数", [record["size"][0] * record["size"][1] / 1e6 for record in records], lambda value: f"{value:.2f}MP")
+    _print_distribution("ファイル", [record["file_size"] for record in records], format_file_size)
+
+    print()
+    for label, key in (("シャープネス", "blur_level"), ("コントラスト", "contrast_level"), ("色数", "color_level")):
+        counts = {level: 0 for level in LEVELS}
+        for record in records:
+            counts[record[key]] += 1
+        print(f"{label}分布: " + " / ".join(f"{level} {counts[level]}" for level in LEVELS))
+
+    print(f"\n推奨プリセット:")
+    clusters = {}
+    for record in records:
+        clusters.setdefault(record["recommendation"]["preset"], []).append(record)
+
+    for preset_name in analysis_config["candidate_presets"]:
+        members = clusters.get(preset_name, [])
+        if not members:
+            continue
+        source = "実測補正" if preset_name in cost_factors else "変換実績なし"
+        total_time = sum_estimates(record["recommendation"]["estimated_time"] for record in members)
+        median_sharpness = np.median([record["sharpness"] for record in members])
+        median_colors = np.median([record["colors"] for record in members])
+        print(f"  {preset_name:<10} {len(members):>6}枚  推定 {format_estimate(total_time)} ({source})"
+              f"  シャープネス中央値 {median_sharpness:.1f}, 色数中央値 {median_colors:.0f}")
+
+    recommended_total = sum_estimates(record["recommendation"]["estimated_time"] for record in records)
+    print(f"\n推奨プリセットで変換した場合の推定時間: {format_estimate(recommended_total)}")
+    for preset_name in analysis_config["candidate_presets"]:
+        single_total = sum_estimates(estimate_time(preset_name, record["size"], cost_factors) for record in records)
+        print(f"  すべて {preset_name} で変換した場合: {format_estimate(single_total)}")
+
+    if verbose:
+        print(f"\n画像別の推奨:")
+        for record in records:
+            recommendation = record["recommendation"]
+            print(f"  {os.path.basename(record['input_path'])}: {recommendation['preset']} "
+                  f"({', '.join(recommendation['reasons'])})")
+
+def export_analysis(records, json_path):
+    with open(json_path, "w", encoding="utf-8") as json_file:
+        json.dump(records, json_file, ensure_ascii=False, indent=2)
+
+def run_analysis(image_files, config, verbose=False):
+    analysis_config = config["quality_analysis"]
+    print(f"\n{len(image_files)}個の画像を分析中（背景除去・SVG変換は行いません）...")
+
+    records = analyze_directory(sorted(str(path) for path in image_files), analysis_config, verbose)
+    if not records:
+        print("分析できる画像がありません")
+        return records
+
+    cost_factors = load_measured_costs(config["processing"]["journal_path"], analysis_config["candidate_presets"])
+    for record in records:
+        record["recommendation"] = recommend_preset(record, analysis_config, cost_factors)
+
+    print_analysis_report(records, analysis_config, cost_factors, verbose)
+    return records
@@ -0,0 +1,303 @@
+import os
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+from config import (
+    get_config_for_quality,
+    LEGACY_PRESET,
+    VTRACER_CONFIG,
+    IMAGE_RESIZE_CONFIG,
+    REMBG_CONFIG,
+    INPUT_DIR,
+    OUTPUT_DIR,
+    SUPPORTED_FORMATS,
+)
+from quality_presets import QUALITY_PRESETS, get_preset, get_preprocessing_config
+from compiled_presets import get_compiled_preset
+from image_processor import get_image_processor
+from thread_budget import compute_thread_budget, set_thread_environment, apply_thread_budget, get_available_cpus
+from worker_pool import SupervisedPool
+from utils import format_time
+from segmentation import (
+    QUANTIZED_SUFFIX,
+    get_session,
+    get_max_batch_size,
+    get_quantized_model_path,
+    prepare_segmentation_inputs,
+    run_segmentation,
+)
+from engine import DEFAULT_ENGINE, load_image, get_image_files
+
+def stub_remove_background(images, rembg_config, verbose=True):
+    return [image.convert("RGBA") for image in images]
+
+def collect_images(input_dir, limit):
+    config = get_config_for_quality()
+    image_files = get_image_files(input_dir, config["supported_formats"])
+    return sorted(str(path) for path in image_files)[:limit]
+
+def benchmark_threads(args):
+    image_files = collect_images(args.input_dir, args.limit)
+    if not image_files:
+        print(f"画像ファイルが見つかりません: {args.input_dir}")
+        return
+
+    tasks = image_files * args.repeat
+    max_workers = args.max_workers or get_available_cpus()
+    total_threads = args.threads or get_available_cpus()
+
+    config = get_config_for_quality(args.quality)
+    config["base_dirs"] = dict(config["base_dirs"], output=tempfile.mkdtemp(prefix="svg_bench_"))
+    config["processing"] = dict(config["processing"], enable_quality_analysis=False)
+
+    engine = DEFAULT_ENGINE
+    if args.stub_segmentation:
+        engine = engine.with_stages(segment=stub_remove_background)
+
+    print(f"スレッド予算ベンチマーク: {len(tasks)}枚, プリセット={args.quality}, 総スレッド={total_threads}")
+    print(f"{'ワーカー':>8} {'スレッド/W':>10} {'処理時間':>10} {'枚/秒':>8} {'スケール':>8}")
+
+    baseline = None
+    for worker_count in range(1, max_workers + 1):
+        threads = compute_thread_budget(worker_count, total_threads)
+        set_thread_environment(threads)
+        pool = SupervisedPool(
+            engine.convert_items,
+            config,
+            worker_count=worker_count,
+            verbose=False,
+            initializer=apply_thread_budget,
+            initargs=(threads,)
+        )
+
+        failures = []
+        start = time.perf_counter()
+        pool.run(tasks, lambda result: failures.append(result) if not result["success"] else None)
+        elapsed = time.perf_counter() - start
+
+        throughput = len(tasks) / elapsed
+        baseline = baseline or throughput
+        print(f"{worker_count:>8} {threads:>10} {format_time(elapsed):>10} {throughput:>8.2f} {throughput / baseline:>7.2f}x")
+        if failures:
+            print(f"  警告: {len(failures)}件失敗 ({failures[0].get('error')})")
+
+def benchmark_segmentation(args):
+    image_files = collect_images(args.input_dir, args.limit)
+    if not image_files:
+        print(f"画像ファイルが見つかりません: {args.input_dir}")
+        return
+
+    images = [load_image(path)[0] for path in image_files]
+    apply_thread_budget(args.threads or get_available_cpus())
+
+    print(f"セグメンテーション バッチベンチマーク: 入力画像{len(images)}枚, 反復{args.repeat}回")
+    for model_name in args.models:
+        session = get_session(model_name)
+        max_batch_size = get_max_batch_size(session)
+        print(f"\nモデル: {model_name}" + (f" (入力バッチ次元が{max_batch_size}に固定)" if max_batch_size else ""))
+        print(f"{'バッチ':>6} {'枚/秒':>8} {'バッチ遅延':>10} {'前処理':>8}")
+
+        run_segmentation(session, prepare_segmentation_inputs(images[:1]))
+
+        for batch_size in args.batch_sizes:
+            batch = [images[i % len(images)] for i in range(batch_size)]
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                inputs = prepare_segmentation_inputs(batch)
+            prepare_elapsed = (time.perf_counter() - start) / args.repeat
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                run_segmentation(session, inputs)
+            inference_elapsed = (time.perf_counter() - start) / args.repeat
+
+            throughput = batch_size / (prepare_elapsed + inference_elapsed)
+            print(f"{batch_size:>6} {throughput:>8.2f} {inference_elapsed * 1000:>8.0f}ms {prepare_elapsed * 1000:>6.0f}ms")
+
+def compute_mask_iou(reference, candidate, threshold=0.5):
+    reference_mask = reference >= threshold
+    candidate_mask = candidate >= threshold
+    union = np.logical_or(reference_mask, candidate_mask).sum(axis=(1, 2))
+    intersection = np.logical_and(reference_mask, candidate_mask).sum(axis=(1, 2))
+    return np.where(union > 0, intersection / np.maximum(union, 1), 1.0)
+
+def normalize_predictions(predictions):
+    low = predictions.min(axis=(1, 2), keepdims=True)
+    high = predictions.max(axis=(1, 2), keepdims=True)
+    return (predictions - low) / np.maximum(high - low, 1e-6)
+
+def time_segmentation(session, inputs, repeat):
+    run_segmentation(session, inputs[:1])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        predictions = run_segmentation(session, inputs)
+    return predictions, (time.perf_counter() - start) / repeat
+
+def benchmark_quantization(args):
+    image_files = collect_images(args.input_dir, args.limit)
+    if not image_files:
+        print(f"画像ファイルが見つかりません: {args.input_dir}")
+        return
+
+    apply_thread_budget(args.threads or get_available_cpus())
+    images = [load_image(path)[0] for path in image_files]
+    inputs = prepare_segmentation_inputs(images)
+
+    print(f"量子化モデル比較: 入力画像{len(images)}枚, 反復{args.repeat}回")
+    print(f"{'モデル':<14} {'fp32':>8} {'int8':>8} {'高速化':>8} {'平均IoU':>8} {'最小IoU':>8}")
+
+    for model_name in args.models:
+        quantized_name = f"{model_name}{QUANTIZED_SUFFIX}"
+        if not os.path.exists(get_quantized_model_path(model_name)):
+            print(f"{model_name:<14} 量子化モデルがありません ('python quantize_models.py --models {model_name}' で生成)")
+            continue
+
+        reference, fp32_elapsed = time_segmentation(get_session(model_name), inputs, args.repeat)
+        candidate, int8_elapsed = time_segmentation(get_session(quantized_name), inputs, args.repeat)
+        iou = compute_mask_iou(normalize_predictions(reference), normalize_predictions(candidate))
+
+        print(f"{model_name:<14} {fp32_elapsed * 1000:>6.0f}ms {int8_elapsed * 1000:>6.0f}ms "
+              f"{fp32_elapsed / int8_elapsed:>7.2f}x {iou.mean():>8.3f} {iou.min():>8.3f}")
+
+LEGACY_PRESET_NAME = "legacy"
+LEGACY_CONFIG_LOOKUPS = 2
+
+def _old_legacy_config():
+    return {
+        "vtracer": VTRACER_CONFIG,
+        "image_resize": IMAGE_RESIZE_CONFIG,
+        "rembg": REMBG_CONFIG,
+        "input_dir": INPUT_DIR,
+        "output_dir": OUTPUT_DIR,
+        "supported_formats": SUPPORTED_FORMATS
+    }
+
+def _dict_setup(preset_name):
+    if preset_name == LEGACY_PRESET_NAME:
+        for _ in range(LEGACY_CONFIG_LOOKUPS):
+            legacy_config = _old_legacy_config()
+        preset = {"image_resize": legacy_config["image_resize"]}
+        vtracer_config = legacy_config["vtracer"]
+        rembg_model = legacy_config["rembg"]["model"]
+    else:
+        preset = get_preset(preset_name)
+        vtracer_config = preset["vtracer"]
+        rembg_model = preset["rembg"]["model"]
+
+    processor = (preset, get_preprocessing_config())
+    preprocessing = preset.get("preprocessing", {})
+    filter_configs = processor[1]
+    if preprocessing.get("enabled") and preprocessing.get("contrast_enhancement"):
+        clahe_config = filter_configs["contrast_enhancement"]["clahe"]
+        cv2.createCLAHE(clipLimit=clahe_config["clip_limit"], tileGridSize=clahe_config["tile_grid_size"])
+    if preprocessing.get("enabled") and preprocessing.get("sharpening"):
+        np.array(filter_configs["sharpening"]["laplacian_kernel"], dtype=np.float32)
+
+    vtracer_kwargs = {
+        "colormode": vtracer_config["colormode"],
+        "hierarchical": vtracer_config["hierarchical"],
+        "mode": vtracer_config["mode"],
+        "filter_speckle": vtracer_config["filter_speckle"],
+        "color_precision": vtracer_config["color_precision"],
+        "layer_difference": vtracer_config["layer_difference"],
+        "corner_threshold": vtracer_config["corner_threshold"],
+        "length_threshold": vtracer_config["length_threshold"],
+        "max_iterations": vtracer_config["max_iterations"],
+        "splice_threshold": vtracer_config["splice_threshold"],
+        "path_precision": vtracer_config.get("path_precision", 8),
+    }
+    return processor, vtracer_kwargs, rembg_model
+
+def _get_benchmark_preset(preset_name):
+    if preset_name == LEGACY_PRESET_NAME:
+        return LEGACY_PRESET
+    return get_compiled_preset(preset_name)
+
+def _compiled_setup(preset_name):
+    preset = _get_benchmark_preset(preset_name)
+    processor = get_image_processor(preset)
+    return processor, preset.vtracer_kwargs, preset.rembg.model
+
+def time_setup(setup_func, preset_name, iterations):
+    setup_func(preset_name)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        setup_func(preset_name)
+    return (time.perf_counter() - start) / iterations
+
+def benchmark_presets(args):
+    print(f"プリセット設定オーバーヘッド: 1画像あたりの準備時間, 反復{args.iterations}回")
+    print(f"{'プリセット':<10} {'従来方式':>10} {'コンパイル済み':>14} {'速度比':>8}  設定キー")
+
+    for preset_name in args.presets:
+        legacy = time_setup(_dict_setup, preset_name, args.iterations)
+        compiled = time_setup(_compiled_setup, preset_name, args.iterations)
+        print(f"{preset_name:<10} {legacy * 1e6:>8.1f}µs {compiled * 1e6:>12.1f}µs {legacy / compiled:>7.1f}x  "
+              f"{_get_benchmark_preset(preset_name).cache_key}")
+
+def main():
+    parser = argparse.ArgumentParser(description="SVGアセット変換ツール ベンチマーク")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    threads_parser = subparsers.add_parser("threads", help="ワーカー数に対するスループットのスケーリングを計測")
+    threads_parser.add_argument("--input-dir", default=os.path.join("knowledge", "images"),
+                               help="ベンチマーク用の入力画像フォルダ")
+    threads_parser.add_argument("--quality", "-q", default="standard",
+                               help="品質プリセット (デフォルト: standard)")
+    threads_parser.add_argument("--limit", type=int, default=8,
+                               help="使用する画像の最大枚数")
+    threads_parser.add_argument("--repeat", type=int, default=2,
+                               help="画像セットの繰り返し回数")
+    threads_parser.add_argument("--max-workers", type=int,
+                               help="計測する最大ワーカー数 (デフォルト: CPUコア数)")
+    threads_parser.add_argument("--threads", type=int,
+                               help="全ワーカーで分け合うスレッド数 (デフォルト: CPUコア数)")
+    threads_parser.add_argument("--stub-segmentation", action="store_true",
+                               help="背景除去をスキップしてOpenCV/VTracer段階のみ計測")
+    threads_parser.set_defaults(handler=benchmark_threads)
+
+    segmentation_parser = subparsers.add_parser("segmentation", help="背景除去のバッチサイズ別スループットと遅延を計測")
+    segmentation_parser.add_argument("--input-dir", default=os.path.join("knowledge", "images"),
+                                    help="ベンチマーク用の入力画像フォルダ")
+    segmentation_parser.add_argument("--models", nargs="+", default=["u2net", "u2netp"],
+                                    help="計測するモデル (デフォルト: u2net u2netp)")
+    segmentation_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8],
+                                    help="計測するバッチサイズ")
+    segmentation_parser.add_argument("--limit", type=int, default=8,
+                                    help="使用する画像の最大枚数")
+    segmentation_parser.add_argument("--repeat", type=int, default=3,
+                                    help="各バッチサイズの反復回数")
+    segmentation_parser.add_argument("--threads", type=int,
+                                    help="ONNX Runtimeのスレッド数 (デフォルト: CPUコア数)")
+    segmentation_parser.set_defaults(handler=benchmark_segmentation)
+
+    quantization_parser = subparsers.add_parser("quantization", help="int8量子化モデルのfp32比の速度とマスクIoUを計測")
+    quantization_parser.add_argument("--input-dir", default=os.path.join("knowledge", "images"),
+                                    help="評価用の入力画像フォルダ")
+    quantization_parser.add_argument("--models", nargs="+", default=["u2net", "u2netp"],
+                                    help="比較するモデル (デフォルト: u2net u2netp)")
+    quantization_parser.add_argument("--limit", type=int, default=16,
+                                    help="使用する画像の最大枚数")
+    quantization_parser.add_argument("--repeat", type=int, default=3,
+                                    help="計測の反復回数")
+    quantization_parser.add_argument("--threads", type=int,
+                                    help="ONNX Runtimeのスレッド数 (デフォルト: CPUコア数)")
+    quantization_parser.set_defaults(handler=benchmark_quantization)
+
+    presets_parser = subparsers.add_parser("presets", help="プリセット設定の1画像あたりの準備オーバーヘッドを計測")
+    presets_parser.add_argument("--presets", nargs="+", choices=[*QUALITY_PRESETS, LEGACY_PRESET_NAME],
+                               default=[*QUALITY_PRESETS, LEGACY_PRESET_NAME],
+                               help="計測するプリセット (デフォルト: すべて)")
+    presets_parser.add_argument("--iterations", type=int, default=2000,
+                               help="計測の反復回数")
+    presets_parser.set_defaults(handler=benchmark_presets)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
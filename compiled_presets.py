@@ -0,0 +1,206 @@
+import json
+import hashlib
+from dataclasses import dataclass, field, asdict
+
+from quality_presets import QUALITY_PRESETS, PREPROCESSING_CONFIGS
+
+VTRACER_CHOICES = {
+    "colormode": ("color", "binary"),
+    "hierarchical": ("stacked", "cutout"),
+    "mode": ("spline", "polygon", "none"),
+}
+
+VTRACER_RANGES = {
+    "filter_speckle": (0, 128),
+    "color_precision": (1, 10),
+    "layer_difference": (0, 255),
+    "corner_threshold": (0, 180),
+    "length_threshold": (0.1, 10.0),
+    "max_iterations": (1, 100),
+    "splice_threshold": (0, 180),
+    "path_precision": (0, 16),
+}
+
+REMBG_RANGES = {
+    "alpha_matting_foreground_threshold": (0, 255),
+    "alpha_matting_background_threshold": (0, 255),
+    "alpha_matting_erode_size": (0, 100),
+}
+
+class PresetError(ValueError):
+    pass
+
+@dataclass(frozen=True, slots=True)
+class ResizeSettings:
+    enabled: bool
+    max_width: int | None
+    max_height: int | None
+    maintain_aspect_ratio: bool
+
+@dataclass(frozen=True, slots=True)
+class PreprocessingSettings:
+    enabled: bool
+    noise_reduction: bool
+    sharpening: bool
+    contrast_enhancement: bool
+    edge_enhancement: bool
+    bilateral_d: int
+    bilateral_sigma_color: float
+    bilateral_sigma_space: float
+    clahe_clip_limit: float
+    clahe_tile_grid_size: tuple
+    laplacian_kernel: tuple
+
+@dataclass(frozen=True, slots=True)
+class RembgSettings:
+    model: str
+    alpha_matting: bool
+    alpha_matting_foreground_threshold: int
+    alpha_matting_background_threshold: int
+    alpha_matting_erode_size: int
+
+@dataclass(frozen=True, slots=True)
+class VTracerSettings:
+    colormode: str
+    hierarchical: str
+    mode: str
+    filter_speckle: int
+    color_precision: int
+    layer_difference: int
+    corner_threshold: int
+    length_threshold: float
+    max_iterations: int
+    splice_threshold: int
+    path_precision: int
+
+    def as_kwargs(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+@dataclass(frozen=True, slots=True)
+class Limits:
+    timeout: int | None
+    max_rss_mb: int | None
+    max_svg_paths: int | None
+    max_svg_mb: int | None
+
+@dataclass(frozen=True, slots=True)
+class CompiledPreset:
+    key: str
+    name: str
+    description: str
+    image_resize: ResizeSettings
+    preprocessing: PreprocessingSettings
+    rembg: RembgSettings
+    vtracer: VTracerSettings
+    limits: Limits
+    cache_key: str
+    vtracer_kwargs: dict = field(compare=False, repr=False)
+
+def _check_range(errors, field, value, low, high):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        errors.append(f"{field}={value!r} (数値が必要です)")
+    elif not low <= value <= high:
+        errors.append(f"{field}={value!r} (許容範囲: {low}〜{high})")
+
+def _check_optional_positive(errors, field, value):
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value <= 0):
+        errors.append(f"{field}={value!r} (正の整数またはNoneが必要です)")
+
+def _validate(settings):
+    errors = []
+    resize, preprocessing, rembg, vtracer, limits = settings
+
+    _check_optional_positive(errors, "image_resize.max_width", resize.max_width)
+    _check_optional_positive(errors, "image_resize.max_height", resize.max_height)
+
+    _check_range(errors, "preprocessing.bilateral_filter.d", preprocessing.bilateral_d, 1, 31)
+    _check_range(errors, "preprocessing.bilateral_filter.sigma_color", preprocessing.bilateral_sigma_color, 0, 1000)
+    _check_range(errors, "preprocessing.bilateral_filter.sigma_space", preprocessing.bilateral_sigma_space, 0, 1000)
+    _check_range(errors, "preprocessing.clahe.clip_limit", preprocessing.clahe_clip_limit, 0, 40)
+    tile_grid_size = preprocessing.clahe_tile_grid_size
+    if len(tile_grid_size) != 2 or any(not isinstance(size, int) or size <= 0 for size in tile_grid_size):
+        errors.append(f"preprocessing.clahe.tile_grid_size={tile_grid_size!r} (正の整数2つが必要です)")
+    kernel = preprocessing.laplacian_kernel
+    if len(kernel) % 2 == 0 or any(len(row) != len(kernel) for row in kernel):
+        errors.append(f"preprocessing.laplacian_kernel の形状が不正です (奇数サイズの正方行列が必要です)")
+
+    if not rembg.model:
+        errors.append("rembg.model が空です")
+    for field, (low, high) in REMBG_RANGES.items():
+        _check_range(errors, f"rembg.{field}", getattr(rembg, field), low, high)
+
+    for field, choices in VTRACER_CHOICES.items():
+        if getattr(vtracer, field) not in choices:
+            errors.append(f"vtracer.{field}={getattr(vtracer, field)!r} (選択肢: {', '.join(choices)})")
+    for field, (low, high) in VTRACER_RANGES.items():
+        _check_range(errors, f"vtracer.{field}", getattr(vtracer, field), low, high)
+
+    _check_optional_positive(errors, "limits.timeout", limits.timeout)
+    _check_optional_positive(errors, "limits.max_rss_mb", limits.max_rss_mb)
+    _check_optional_positive(errors, "limits.max_svg_paths", limits.max_svg_paths)
+    _check_optional_positive(errors, "limits.max_svg_mb", limits.max_svg_mb)
+    return errors
+
+def compute_cache_key(*settings):
+    payload = json.dumps([asdict(item) for item in settings], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def compile_preset(preset_key, preset, filter_configs=PREPROCESSING_CONFIGS):
+    preprocessing = preset.get("preprocessing", {})
+    bilateral = filter_configs["noise_reduction"]["bilateral_filter"]
+    clahe = filter_configs["contrast_enhancement"]["clahe"]
+    limits = preset.get("limits", {})
+
+    try:
+        settings = (
+            ResizeSettings(**preset["image_resize"]),
+            PreprocessingSettings(
+                enabled=preprocessing.get("enabled", False),
+                noise_reduction=preprocessing.get("noise_reduction", False),
+                sharpening=preprocessing.get("sharpening", False),
+                contrast_enhancement=preprocessing.get("contrast_enhancement", False),
+                edge_enhancement=preprocessing.get("edge_enhancement", False),
+                bilateral_d=bilateral["d"],
+                bilateral_sigma_color=bilateral["sigma_color"],
+                bilateral_sigma_space=bilateral["sigma_space"],
+                clahe_clip_limit=clahe["clip_limit"],
+                clahe_tile_grid_size=tuple(clahe["tile_grid_size"]),
+                laplacian_kernel=tuple(tuple(row) for row in filter_configs["sharpening"]["laplacian_kernel"]),
+            ),
+            RembgSettings(**preset["rembg"]),
+            VTracerSettings(**preset["vtracer"]),
+            Limits(
+                timeout=limits.get("timeout"),
+                max_rss_mb=limits.get("max_rss_mb"),
+                max_svg_paths=limits.get("max_svg_paths"),
+                max_svg_mb=limits.get("max_svg_mb"),
+            ),
+        )
+    except (KeyError, TypeError) as e:
+        raise PresetError(f"品質プリセット '{preset_key}' の項目が不正です: {e}") from e
+
+    errors = _validate(settings)
+    if errors:
+        raise PresetError(f"品質プリセット '{preset_key}' が不正です:\n  " + "\n  ".join(errors))
+
+    resize, preprocessing_settings, rembg, vtracer, limits_settings = settings
+    return CompiledPreset(
+        key=preset_key,
+        name=preset.get("name", preset_key),
+        description=preset.get("description", ""),
+        image_resize=resize,
+        preprocessing=preprocessing_settings,
+        rembg=rembg,
+        vtracer=vtracer,
+        limits=limits_settings,
+        cache_key=compute_cache_key(resize, preprocessing_settings, rembg, vtracer),
+        vtracer_kwargs=vtracer.as_kwargs(),
+    )
+
+COMPILED_PRESETS = {name: compile_preset(name, preset) for name, preset in QUALITY_PRESETS.items()}
+
+def get_compiled_preset(preset_name="standard"):
+    if preset_name not in COMPILED_PRESETS:
+        print(f"警告: 不明な品質プリセット '{preset_name}'。標準品質を使用します。")
+        preset_name = "standard"
+    return COMPILED_PRESETS[preset_name]
@@ -1,5 +1,6 @@
 import os
-from quality_presets import get_preset, list_presets
+from quality_presets import list_presets
+from compiled_presets import compile_preset, get_compiled_preset
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -45,72 +46,137 @@ PROCESSING_CONFIG = {
     "enable_quality_analysis": True,
     "cleanup_temp_files": True,
     "max_concurrent_processes": 1,
+    "worker_isolation": True,
+    "thread_budget": None,
+    "segmentation_batch_size": 1,
+    "segmentation_max_wait": 0.05,
+    "roi_crop": True,
+    "roi_margin": 8,
+    "async_io": False,
+    "prefetch": 4,
+    "journal_path": os.path.join(OUTPUT_DIR, ".progress_journal.jsonl"),
 }
 
-def get_config_for_quality(quality_preset=None):
-    if quality_preset is None:
-        quality_preset = DEFAULT_QUALITY_PRESET
-    
-    preset = get_preset(quality_preset)
-    
+DUPLICATE_DETECTION_CONFIG = {
+    "enabled": False,
+    "algorithm": "dhash",
+    "hash_size": 8,
+    "max_distance": 6,
+    "action": "report",
+}
+
+SVG_OUTPUT_CONFIG = {
+    "chunk_size": 1024 * 1024,
+    "compress": False,
+    "compression_level": 6,
+    "fallback_presets": {
+        "ultra": "high",
+        "high": "standard",
+        "standard": "draft",
+    },
+}
+
+PROFILING_CONFIG = {
+    "enabled": False,
+    "keep_slowest": 10,
+    "output_dir": os.path.join(OUTPUT_DIR, "profiles"),
+}
+
+QUALITY_ANALYSIS_CONFIG = {
+    "thumbnail_size": 256,
+    "batch_size": 64,
+    "blur_thresholds": (180, 900),
+    "contrast_thresholds": (50, 100),
+    "color_bits": 4,
+    "color_thresholds": (64, 512),
+    "candidate_presets": ["draft", "standard", "high"],
+}
+
+SPRITE_CONFIG = {
+    "output_dir": os.path.join(OUTPUT_DIR, "sprites"),
+    "symbols_per_sheet": 200,
+    "sheet_prefix": "sprite",
+}
+
+def build_config(preset, processing_config=PROCESSING_CONFIG):
     return {
-        "quality_preset": quality_preset,
+        "quality_preset": preset.key,
         "preset": preset,
-        "image_resize": preset["image_resize"],
-        "rembg": preset["rembg"],
-        "vtracer": preset["vtracer"],
-        "preprocessing": preset["preprocessing"],
+        "image_resize": preset.image_resize,
+        "rembg": preset.rembg,
+        "vtracer": preset.vtracer,
+        "preprocessing": preset.preprocessing,
+        "limits": preset.limits,
         "base_dirs": {
             "input": INPUT_DIR,
             "output": OUTPUT_DIR,
             "base": BASE_DIR
         },
         "supported_formats": SUPPORTED_FORMATS,
-        "processing": PROCESSING_CONFIG
+        "processing": processing_config,
+        "duplicate_detection": DUPLICATE_DETECTION_CONFIG,
+        "quality_analysis": QUALITY_ANALYSIS_CONFIG,
+        "svg_output": SVG_OUTPUT_CONFIG,
+        "profiling": PROFILING_CONFIG,
+        "sprites": SPRITE_CONFIG
     }
 
-def print_current_config(quality_preset=None):
-    config = get_config_for_quality(quality_preset)
+def get_config_for_quality(quality_preset=None):
+    if quality_preset is None:
+        quality_preset = DEFAULT_QUALITY_PRESET
+    
+    return build_config(get_compiled_preset(quality_preset))
+
+def print_current_config(quality_preset=None, config=None):
+    if config is None:
+        config = get_config_for_quality(quality_preset)
     preset = config["preset"]
+    limits = config["limits"]
     
     print(f"\n現在の設定:")
-    print(f"  品質プリセット: {config['quality_preset']} - {preset['name']}")
-    print(f"  説明: {preset['description']}")
-    print(f"  画像リサイズ: {'有効' if preset['image_resize']['enabled'] else '無効'}")
+    print(f"  品質プリセット: {config['quality_preset']} - {preset.name}")
+    print(f"  説明: {preset.description}")
+    print(f"  設定キー: {preset.cache_key}")
+    print(f"  画像リサイズ: {'有効' if preset.image_resize.enabled else '無効'}")
     
-    if preset['image_resize']['enabled']:
-        max_w = preset['image_resize']['max_width']
-        max_h = preset['image_resize']['max_height']
+    if preset.image_resize.enabled:
+        max_w = preset.image_resize.max_width
+        max_h = preset.image_resize.max_height
         if max_w and max_h:
             print(f"    最大サイズ: {max_w}x{max_h}")
         else:
             print(f"    最大サイズ: 無制限")
     
-    print(f"  前処理: {'有効' if preset['preprocessing']['enabled'] else '無効'}")
-    if preset['preprocessing']['enabled']:
+    preprocessing = preset.preprocessing
+    print(f"  前処理: {'有効' if preprocessing.enabled else '無効'}")
+    if preprocessing.enabled:
         features = []
-        if preset['preprocessing'].get('noise_reduction', False):
+        if preprocessing.noise_reduction:
             features.append("ノイズ除去")
-        if preset['preprocessing'].get('sharpening', False):
+        if preprocessing.sharpening:
             features.append("シャープ化")
-        if preset['preprocessing'].get('contrast_enhancement', False):
+        if preprocessing.contrast_enhancement:
             features.append("コントラスト強化")
-        if preset['preprocessing'].get('edge_enhancement', False):
+        if preprocessing.edge_enhancement:
             features.append("エッジ強化")
         if features:
             print(f"    機能: {', '.join(features)}")
     
-    print(f"  背景除去モデル: {preset['rembg']['model']}")
-    print(f"  アルファマッティング: {'有効' if preset['rembg']['alpha_matting'] else '無効'}")
-    print(f"  VTracer色精度: {preset['vtracer']['color_precision']}")
-    print(f"  VTracerフィルタスペックル: {preset['vtracer']['filter_speckle']}")
+    print(f"  背景除去モデル: {preset.rembg.model}")
+    print(f"  アルファマッティング: {'有効' if preset.rembg.alpha_matting else '無効'}")
+    print(f"  VTracer色精度: {preset.vtracer.color_precision}")
+    print(f"  VTracerフィルタスペックル: {preset.vtracer.filter_speckle}")
+    print(f"  タイムアウト: {limits.timeout}秒")
+    print(f"  メモリ上限: {limits.max_rss_mb}MB")
+    print(f"  SVG上限: {limits.max_svg_paths}パス / {limits.max_svg_mb}MB")
+
+LEGACY_PRESET = compile_preset("legacy", {
+    "name": "レガシー設定",
+    "description": "convert_to_svg.py の固定設定",
+    "image_resize": IMAGE_RESIZE_CONFIG,
+    "rembg": REMBG_CONFIG,
+    "vtracer": VTRACER_CONFIG,
+})
 
 def get_legacy_config():
-    return {
-        "vtracer": VTRACER_CONFIG,
-        "image_resize": IMAGE_RESIZE_CONFIG,
-        "rembg": REMBG_CONFIG,
-        "input_dir": INPUT_DIR,
-        "output_dir": OUTPUT_DIR,
-        "supported_formats": SUPPORTED_FORMATS
-    }
\ No newline at end of file
+    return build_config(LEGACY_PRESET, dict(PROCESSING_CONFIG, enable_quality_analysis=False, roi_crop=False))
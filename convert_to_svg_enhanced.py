@@ -1,149 +1,88 @@
-import os
 import sys
 import argparse
-from pathlib import Path
-from PIL import Image
-import vtracer
-from rembg import remove
-from io import BytesIO
+from dataclasses import replace
 
 from config import get_config_for_quality, print_current_config
-from quality_presets import list_presets
-from image_processor import ImageProcessor
+from quality_presets import QUALITY_PRESETS, list_presets
+from batch_analyzer import run_analysis, export_analysis
+from duplicate_detector import find_duplicate_groups, print_duplicate_report, link_duplicate_outputs
+from engine import DEFAULT_ENGINE, ensure_directories, get_image_files, read_file
 from utils import (
     ProcessingTimer, 
-    format_time, 
     create_progress_bar, 
+    build_processing_summary,
     print_processing_summary,
-    print_quality_analysis,
+    export_processing_summary,
     validate_input_directory,
     create_output_directory,
     clean_temp_files,
-    compare_file_sizes,
     print_system_info
 )
+from progress_journal import ProgressJournal
+from worker_pool import SupervisedPool
+from svg_writer import get_svg_extension
+from async_driver import AsyncBatchDriver
+from profiling import ProfileCollector
+from sprite_builder import SpriteBuilder
+from thread_budget import compute_thread_budget, set_thread_environment, apply_thread_budget
 
-def ensure_directories(config):
-    input_dir = config["base_dirs"]["input"]
-    output_dir = config["base_dirs"]["output"]
+def run_batch(image_files, config, journal, profiler=None, engine=DEFAULT_ENGINE):
+    processing_config = config["processing"]
+    verbose = processing_config["verbose"]
+    results = []
     
-    os.makedirs(input_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
+    batch_func = engine.profiled_convert_items if profiler else engine.convert_items
     
-    knowledge_images_dir = os.path.join(input_dir, "images")
-    if os.path.exists(knowledge_images_dir):
-        return knowledge_images_dir
-    return input_dir
-
-def get_image_files(input_dir, supported_formats):
-    image_files = set()
-    for format in supported_formats:
-        image_files.update(Path(input_dir).rglob(f"*{format}"))
-        image_files.update(Path(input_dir).rglob(f"*{format.upper()}"))
-    return list(image_files)
-
-def remove_background(image_path, rembg_config, verbose=True):
-    if verbose:
-        print(f"  背景除去中...")
-    
-    with open(image_path, "rb") as input_file:
-        input_data = input_file.read()
-    
-    output_data = remove(
-        input_data,
-        model=rembg_config["model"],
-        alpha_matting=rembg_config["alpha_matting"],
-        alpha_matting_foreground_threshold=rembg_config["alpha_matting_foreground_threshold"],
-        alpha_matting_background_threshold=rembg_config["alpha_matting_background_threshold"],
-        alpha_matting_erode_size=rembg_config["alpha_matting_erode_size"],
-    )
-    
-    return Image.open(BytesIO(output_data))
-
-def convert_to_svg(input_path, config, verbose=True):
-    if verbose:
-        print(f"\n処理中: {os.path.basename(input_path)}")
+    def handle_result(result):
+        if profiler:
+            profiler.add(result)
+        journal.record(result, config["preset"])
+        results.append(result)
+        if processing_config["show_progress"]:
+            progress = create_progress_bar(len(results), len(image_files))
+            print(f"\n進捗: {progress} ({len(results)}/{len(image_files)})")
     
-    timer = ProcessingTimer()
-    timer.start()
+    tasks = [str(image_path) for image_path in image_files]
+    worker_count = processing_config["max_concurrent_processes"]
+    threads = compute_thread_budget(worker_count, processing_config["thread_budget"])
     
-    try:
-        processor = ImageProcessor(config["preset"])
-        
-        if config["processing"]["enable_quality_analysis"] and verbose:
-            original_image = Image.open(input_path)
-            analysis = processor.analyze_image_quality(original_image)
-            print_quality_analysis(analysis)
-        
-        image_with_no_bg = remove_background(input_path, config["rembg"], verbose)
-        
-        processed_image = processor.process_image(image_with_no_bg, verbose)
-        
-        resized_image = processor.resize_image(processed_image, verbose)
-        
-        temp_filename = f"temp_{os.path.splitext(os.path.basename(input_path))[0]}.png"
-        temp_path = os.path.join(config["base_dirs"]["output"], temp_filename)
-        resized_image.save(temp_path, "PNG")
-        
-        if verbose:
-            print(f"  SVG変換中...")
-        
-        svg_filename = os.path.splitext(os.path.basename(input_path))[0] + ".svg"
-        svg_path = os.path.join(config["base_dirs"]["output"], svg_filename)
-        
-        if not os.path.exists(temp_path):
-            if verbose:
-                print(f"  エラー: 一時ファイルが見つかりません: {temp_path}")
-            return False
-        
-        vtracer_config = config["vtracer"]
-        vtracer.convert_image_to_svg_py(
-            temp_path,
-            svg_path,
-            colormode=vtracer_config["colormode"],
-            hierarchical=vtracer_config["hierarchical"],
-            mode=vtracer_config["mode"],
-            filter_speckle=vtracer_config["filter_speckle"],
-            color_precision=vtracer_config["color_precision"],
-            layer_difference=vtracer_config["layer_difference"],
-            corner_threshold=vtracer_config["corner_threshold"],
-            length_threshold=vtracer_config["length_threshold"],
-            max_iterations=vtracer_config["max_iterations"],
-            splice_threshold=vtracer_config["splice_threshold"],
-            path_precision=vtracer_config.get("path_precision", 8),
+    batch_size = processing_config["segmentation_batch_size"]
+    
+    if processing_config["async_io"] and not processing_config["worker_isolation"]:
+        print("警告: async_io はワーカープロセスで変換するため、worker_isolation=False は無視されます")
+    
+    if processing_config["async_io"] or processing_config["worker_isolation"]:
+        set_thread_environment(threads)
+        pool = SupervisedPool(
+            batch_func,
+            config,
+            worker_count=worker_count,
+            timeout=config["limits"].timeout,
+            max_rss_mb=config["limits"].max_rss_mb,
+            verbose=verbose,
+            initializer=apply_thread_budget,
+            initargs=(threads,),
+            batch_size=batch_size,
+            max_wait=processing_config["segmentation_max_wait"],
+            temp_dirs=[config["base_dirs"]["output"]]
         )
-        
-        if config["processing"]["cleanup_temp_files"] and os.path.exists(temp_path):
-            os.remove(temp_path)
-        
-        timer.stop()
-        
-        if verbose:
-            size_comparison = compare_file_sizes(input_path, svg_path)
-            if size_comparison:
-                print(f"  完了: {svg_filename}")
-                print(f"    ファイルサイズ: {size_comparison['input_size']} → {size_comparison['output_size']}")
-                if size_comparison['size_reduction']:
-                    print(f"    圧縮率: {size_comparison['compression_ratio']:.1f}%削減")
-                else:
-                    print(f"    サイズ変化: {abs(size_comparison['compression_ratio']):.1f}%増加")
-            else:
-                print(f"  完了: {svg_filename}")
-            print(f"    処理時間: {timer.elapsed_formatted()}")
-        
-        return True
-        
-    except Exception as e:
-        timer.stop()
-        if verbose:
-            print(f"  エラー: {str(e)}")
-            print(f"    処理時間: {timer.elapsed_formatted()}")
-        return False
+        if processing_config["async_io"]:
+            AsyncBatchDriver(read_file, pool, prefetch=processing_config["prefetch"]).run(tasks, handle_result)
+        else:
+            pool.run(tasks, handle_result)
+    else:
+        apply_thread_budget(threads)
+        for start in range(0, len(tasks), batch_size):
+            items = [(input_path, None) for input_path in tasks[start:start + batch_size]]
+            for result in batch_func(items, config, verbose):
+                handle_result(result)
+    
+    return results
 
 def main():
     parser = argparse.ArgumentParser(description="SVGアセット変換ツール（高品質版）")
     parser.add_argument("--quality", "-q", 
-                       choices=["draft", "standard", "high", "ultra"],
+                       choices=list(QUALITY_PRESETS),
                        default="standard",
                        help="品質プリセット (デフォルト: standard)")
     parser.add_argument("--list-presets", action="store_true",
@@ -154,8 +93,64 @@ def main():
                        help="システム情報を表示")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="詳細な出力を表示")
+    parser.add_argument("--dedupe", action="store_true",
+                       help="知覚ハッシュで重複画像を検出し、代表画像のみ変換")
+    parser.add_argument("--dedupe-distance", type=int,
+                       help="重複とみなすハミング距離の上限")
+    parser.add_argument("--dedupe-action", choices=["report", "link"],
+                       help="重複画像の扱い (report: 報告のみ, link: 代表SVGへリンク)")
+    parser.add_argument("--resume", action="store_true",
+                       help="進捗ジャーナルから中断したバッチを再開")
+    parser.add_argument("--workers", "-j", type=int,
+                       help="並列ワーカー数")
+    parser.add_argument("--threads", type=int,
+                       help="全ワーカーで分け合うスレッド数 (デフォルト: 利用可能なCPUコア数)")
+    parser.add_argument("--segment-batch-size", type=int,
+                       help="背景除去を1回の推論でまとめて処理する画像枚数")
+    parser.add_argument("--segment-max-wait", type=float,
+                       help="バッチが揃うまでの最大待機秒数")
+    parser.add_argument("--timeout", type=float,
+                       help="1画像あたりのタイムアウト秒数 (プリセット値を上書き)")
+    parser.add_argument("--max-rss-mb", type=int,
+                       help="ワーカーあたりのメモリ上限MB (プリセット値を上書き)")
+    parser.add_argument("--max-svg-paths", type=int,
+                       help="1つのSVGのパス数上限。超えた場合は粗いプリセットで再トレース (プリセット値を上書き)")
+    parser.add_argument("--max-svg-mb", type=int,
+                       help="1つのSVGのサイズ上限MB。超えた場合は粗いプリセットで再トレース (プリセット値を上書き)")
+    parser.add_argument("--compress", action="store_true",
+                       help="SVGをgzip圧縮した .svgz として出力")
+    parser.add_argument("--build-sprites", action="store_true",
+                       help="変換後に出力SVGからシンボルスプライトを差分生成")
+    parser.add_argument("--summary-top", type=int, default=5,
+                       help="サマリーに表示する処理時間・サイズ上位の件数")
+    parser.add_argument("--summary-json",
+                       help="処理結果サマリーをJSONファイルに出力")
+    parser.add_argument("--no-isolation", action="store_true",
+                       help="ワーカープロセスを使わずに同一プロセスで変換")
+    parser.add_argument("--no-roi-crop", action="store_true",
+                       help="前景の範囲への切り抜きを無効化し、画像全体を処理")
+    parser.add_argument("--roi-margin", type=int,
+                       help="前景の範囲の周囲に残す余白ピクセル数 (デフォルト: 8)")
+    parser.add_argument("--analyze-only", action="store_true",
+                       help="変換せずにフォルダ全体の画質を分析し、推奨プリセットを表示")
+    parser.add_argument("--analysis-json",
+                       help="--analyze-only の画像別分析結果をJSONファイルに出力")
+    parser.add_argument("--blur-thresholds", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                       help="シャープネスの低/中/高のしきい値 (解析用サムネイル上の値, デフォルト: 180 900)")
+    parser.add_argument("--contrast-thresholds", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                       help="コントラストの低/中/高のしきい値 (デフォルト: 50 100)")
+    parser.add_argument("--profile", action="store_true",
+                       help="画像ごとにcProfileで計測し、処理時間の長い画像のプロファイルを出力")
+    parser.add_argument("--profile-slowest", type=int, metavar="N",
+                       help="プロファイルを保存する処理時間上位の件数 (デフォルト: 10, 指定時は --profile を有効化)")
+    parser.add_argument("--async-io", action="store_true",
+                       help="入力ファイルを先読みして変換と読み込みを重ねる (ネットワークストレージ向け、--no-isolation とは併用不可)")
+    parser.add_argument("--prefetch", type=int,
+                       help="先読みする入力ファイル数 (--async-io 使用時)")
     
     args = parser.parse_args()
+    if args.async_io and args.no_isolation:
+        parser.error("--async-io は監視付きワーカープロセスで変換するため、--no-isolation とは併用できません")
     
     if args.list_presets:
         list_presets()
@@ -169,15 +164,62 @@ def main():
     
     if args.verbose:
         config["processing"]["verbose"] = True
+    if args.workers:
+        config["processing"]["max_concurrent_processes"] = args.workers
+    if args.threads:
+        config["processing"]["thread_budget"] = args.threads
+    if args.segment_batch_size:
+        config["processing"]["segmentation_batch_size"] = args.segment_batch_size
+    if args.segment_max_wait is not None:
+        config["processing"]["segmentation_max_wait"] = args.segment_max_wait
+    if args.no_isolation:
+        config["processing"]["worker_isolation"] = False
+    if args.blur_thresholds:
+        config["quality_analysis"] = dict(config["quality_analysis"], blur_thresholds=tuple(args.blur_thresholds))
+    if args.contrast_thresholds:
+        config["quality_analysis"] = dict(config["quality_analysis"], contrast_thresholds=tuple(args.contrast_thresholds))
+    if args.max_svg_paths is not None:
+        config["limits"] = replace(config["limits"], max_svg_paths=args.max_svg_paths)
+    if args.max_svg_mb is not None:
+        config["limits"] = replace(config["limits"], max_svg_mb=args.max_svg_mb)
+    if args.compress:
+        config["svg_output"] = dict(config["svg_output"], compress=True)
+    
+    if args.no_roi_crop:
+        config["processing"]["roi_crop"] = False
+    if args.roi_margin is not None:
+        config["processing"]["roi_margin"] = args.roi_margin
+    if args.async_io:
+        config["processing"]["async_io"] = True
+    if args.prefetch:
+        config["processing"]["prefetch"] = args.prefetch
+    
+    if args.profile or args.profile_slowest:
+        config["profiling"]["enabled"] = True
+    if args.profile_slowest:
+        config["profiling"]["keep_slowest"] = args.profile_slowest
+    
+    if args.timeout is not None:
+        config["limits"] = replace(config["limits"], timeout=args.timeout)
+    if args.max_rss_mb is not None:
+        config["limits"] = replace(config["limits"], max_rss_mb=args.max_rss_mb)
+    
+    dedupe_config = config["duplicate_detection"]
+    if args.dedupe:
+        dedupe_config["enabled"] = True
+    if args.dedupe_distance is not None:
+        dedupe_config["max_distance"] = args.dedupe_distance
+    if args.dedupe_action:
+        dedupe_config["action"] = args.dedupe_action
     
     if args.show_config:
-        print_current_config(args.quality)
+        print_current_config(config=config)
         return
     
     print("SVGアセット変換ツール（高品質版）")
     print("=" * 50)
     
-    print_current_config(args.quality)
+    print_current_config(config=config)
     
     input_dir = ensure_directories(config)
     
@@ -195,31 +237,74 @@ def main():
     
     image_files = get_image_files(input_dir, config["supported_formats"])
     
+    if args.analyze_only:
+        records = run_analysis(image_files, config, args.verbose)
+        if args.analysis_json:
+            export_analysis(records, args.analysis_json)
+            print(f"\n分析結果をJSONに出力しました: {args.analysis_json}")
+        return
+    
+    duplicate_groups = []
+    if dedupe_config["enabled"]:
+        print(f"\n重複画像を検出中...")
+        groups = find_duplicate_groups(image_files, dedupe_config, config["processing"]["verbose"])
+        print_duplicate_report(groups)
+        image_files = [group["representative"] for group in groups]
+        duplicate_groups = [group for group in groups if group["duplicates"]]
+    
+    journal = ProgressJournal(config["processing"]["journal_path"])
+    if args.resume:
+        journal.load()
+        pending_files = [path for path in image_files if not journal.is_completed(str(path), config["preset"])]
+        skipped_count = len(image_files) - len(pending_files)
+        if skipped_count > 0:
+            print(f"\n再開: 完了済み{skipped_count}ファイルをスキップします")
+        image_files = pending_files
+        if not image_files:
+            print(f"\nすべてのファイルが変換済みです")
+            return
+    
     print(f"\n変換を開始します...")
     
     total_timer = ProcessingTimer()
     total_timer.start()
     
-    success_count = 0
-    for i, image_path in enumerate(image_files, 1):
-        if config["processing"]["show_progress"]:
-            progress = create_progress_bar(i-1, len(image_files))
-            print(f"\n進捗: {progress} ({i}/{len(image_files)})")
-        
-        if convert_to_svg(str(image_path), config, config["processing"]["verbose"]):
-            success_count += 1
-    
-    total_timer.stop()
+    profiler = None
+    if config["profiling"]["enabled"]:
+        profiler = ProfileCollector(config["profiling"]["output_dir"], config["profiling"]["keep_slowest"])
     
     if config["processing"]["cleanup_temp_files"]:
         clean_temp_files(config["base_dirs"]["output"])
     
-    print_processing_summary(
-        success_count, 
-        len(image_files), 
-        total_timer.elapsed(), 
-        config["base_dirs"]["output"]
-    )
+    journal.open(resume=args.resume)
+    try:
+        results = run_batch(image_files, config, journal, profiler)
+    finally:
+        journal.close()
+    
+    total_timer.stop()
+    
+    if profiler:
+        profiler.print_report(profiler.write())
+    
+    if duplicate_groups and dedupe_config["action"] == "link":
+        linked_count = 0
+        for group in duplicate_groups:
+            linked_count += link_duplicate_outputs(
+                group, config["base_dirs"]["output"], get_svg_extension(config["svg_output"])
+            )
+        print(f"\n重複画像{linked_count}件を代表SVGにリンクしました")
+    
+    if args.build_sprites:
+        print()
+        SpriteBuilder(config["base_dirs"]["output"], config["sprites"]).build()
+    
+    summary = build_processing_summary(results, total_timer.elapsed(), args.summary_top)
+    print_processing_summary(summary, config["base_dirs"]["output"])
+    
+    if args.summary_json:
+        export_processing_summary(summary, results, args.summary_json)
+        print(f"\nサマリーをJSONに出力しました: {args.summary_json}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
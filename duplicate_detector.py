@@ -0,0 +1,137 @@
+import os
+import shutil
+import numpy as np
+from PIL import Image
+
+HASH_ALGORITHMS = ("dhash", "phash")
+
+def _load_thumbnail(image_path, width, height):
+    with Image.open(image_path) as image:
+        original_size = image.size
+        image.draft("L", (width * 4, height * 4))
+        gray = image.convert("L").resize((width, height), Image.Resampling.BILINEAR)
+    return np.asarray(gray, dtype=np.float32), original_size
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix
+
+def compute_dhash(pixels):
+    return np.packbits(pixels[:, 1:] > pixels[:, :-1])
+
+def compute_phash(pixels, hash_size=8):
+    dct = _dct_matrix(pixels.shape[0])
+    coefficients = dct @ pixels @ dct.T
+    low = coefficients[:hash_size, :hash_size].ravel()
+    return np.packbits(low > np.median(low[1:]))
+
+def compute_image_hash(image_path, algorithm="dhash", hash_size=8):
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"不明なハッシュアルゴリズム: {algorithm}")
+
+    if algorithm == "phash":
+        pixels, original_size = _load_thumbnail(image_path, hash_size * 4, hash_size * 4)
+        return compute_phash(pixels, hash_size), original_size
+
+    pixels, original_size = _load_thumbnail(image_path, hash_size + 1, hash_size)
+    return compute_dhash(pixels), original_size
+
+def hamming_distances(hash_matrix, index):
+    xor = np.bitwise_xor(hash_matrix, hash_matrix[index])
+    return np.unpackbits(xor, axis=1).sum(axis=1)
+
+def _quality_key(entry):
+    width, height = entry["size"]
+    return (width * height, entry["file_size"])
+
+def find_duplicate_groups(image_files, dedupe_config, verbose=True):
+    entries = []
+    for image_path in image_files:
+        try:
+            image_hash, size = compute_image_hash(
+                image_path,
+                dedupe_config["algorithm"],
+                dedupe_config["hash_size"]
+            )
+        except Exception as e:
+            if verbose:
+                print(f"  警告: ハッシュ計算に失敗しました: {os.path.basename(str(image_path))} - {str(e)}")
+            entries.append({"path": image_path, "hash": None})
+            continue
+        entries.append({
+            "path": image_path,
+            "hash": image_hash,
+            "size": size,
+            "file_size": os.path.getsize(image_path),
+        })
+
+    hashed = [entry for entry in entries if entry["hash"] is not None]
+    groups = [
+        {"representative": entry["path"], "duplicates": []}
+        for entry in entries if entry["hash"] is None
+    ]
+    if not hashed:
+        return groups
+
+    hash_matrix = np.stack([entry["hash"] for entry in hashed])
+    unassigned = np.ones(len(hashed), dtype=bool)
+
+    for index in range(len(hashed)):
+        if not unassigned[index]:
+            continue
+        distances = hamming_distances(hash_matrix, index)
+        members = np.flatnonzero(unassigned & (distances <= dedupe_config["max_distance"]))
+        unassigned[members] = False
+
+        best = max(members, key=lambda member: _quality_key(hashed[member]))
+        groups.append({
+            "representative": hashed[best]["path"],
+            "duplicates": [
+                (hashed[member]["path"], int(distances[member]))
+                for member in members if member != best
+            ],
+        })
+
+    return groups
+
+def print_duplicate_report(groups):
+    duplicate_groups = [group for group in groups if group["duplicates"]]
+    if not duplicate_groups:
+        print("重複画像は見つかりませんでした")
+        return
+
+    duplicate_count = sum(len(group["duplicates"]) for group in duplicate_groups)
+    print(f"重複画像: {len(duplicate_groups)}グループ、{duplicate_count}ファイルの変換をスキップします")
+    for group in duplicate_groups:
+        print(f"  {os.path.basename(str(group['representative']))} (変換対象)")
+        for duplicate_path, distance in group["duplicates"]:
+            print(f"    = {os.path.basename(str(duplicate_path))} (距離: {distance})")
+
+def link_duplicate_outputs(group, output_dir, extension=".svg"):
+    representative_svg = os.path.join(
+        output_dir,
+        os.path.splitext(os.path.basename(str(group["representative"])))[0] + extension
+    )
+    if not os.path.exists(representative_svg):
+        return 0
+
+    linked_count = 0
+    for duplicate_path, _ in group["duplicates"]:
+        duplicate_svg = os.path.join(
+            output_dir,
+            os.path.splitext(os.path.basename(str(duplicate_path)))[0] + extension
+        )
+        if os.path.abspath(duplicate_svg) == os.path.abspath(representative_svg):
+            continue
+        if os.path.lexists(duplicate_svg):
+            os.remove(duplicate_svg)
+        try:
+            os.symlink(os.path.basename(representative_svg), duplicate_svg)
+        except OSError:
+            shutil.copyfile(representative_svg, duplicate_svg)
+        linked_count += 1
+
+    return linked_count
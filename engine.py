@@ -0,0 +1,319 @@
+import os
+import tempfile
+from pathlib import Path
+from PIL import Image
+import vtracer
+from io import BytesIO
+
+from compiled_presets import get_compiled_preset
+from image_processor import get_image_processor
+from segmentation import segment_images
+from svg_writer import SVG_EXTENSION, get_svg_extension, check_svg_limits, scan_svg_file, write_svg_stream
+from profiling import profile_call
+from utils import (
+    ProcessingTimer,
+    format_time,
+    print_quality_analysis,
+    compare_sizes,
+    compute_data_hash,
+)
+
+STAGE_NAMES = ("decode", "segment", "preprocess", "resize", "trace", "write")
+
+def ensure_directories(config):
+    input_dir = config["base_dirs"]["input"]
+    output_dir = config["base_dirs"]["output"]
+
+    os.makedirs(input_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    knowledge_images_dir = os.path.join(input_dir, "images")
+    if os.path.exists(knowledge_images_dir):
+        return knowledge_images_dir
+    return input_dir
+
+def get_image_files(input_dir, supported_formats):
+    image_files = set()
+    for format in supported_formats:
+        image_files.update(Path(input_dir).rglob(f"*{format}"))
+        image_files.update(Path(input_dir).rglob(f"*{format.upper()}"))
+    return list(image_files)
+
+def read_file(file_path):
+    with open(file_path, "rb") as input_file:
+        return input_file.read()
+
+def decode_image(input_data):
+    image = Image.open(BytesIO(input_data))
+    image.load()
+    return image
+
+def load_image(image_path):
+    input_data = read_file(image_path)
+    return decode_image(input_data), input_data
+
+def get_output_path(input_path, output_dir, extension=SVG_EXTENSION):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0] + extension)
+
+def remove_background(images, rembg_config, verbose=True):
+    if verbose:
+        print(f"  背景除去中... ({len(images)}枚)")
+
+    return segment_images(images, rembg_config)
+
+def preprocess_image(image, processor, verbose=True):
+    return processor.process_image(image, verbose)
+
+def resize_image(image, processor, region=None, verbose=True):
+    if region:
+        return processor.resize_region(image, region, verbose)
+    return processor.resize_image(image, verbose)
+
+def make_scratch_path(suffix):
+    scratch_fd, scratch_path = tempfile.mkstemp(suffix=suffix)
+    os.close(scratch_fd)
+    return scratch_path
+
+def remove_scratch_file(scratch_path):
+    if os.path.exists(scratch_path):
+        os.remove(scratch_path)
+
+def trace_image(image, vtracer_kwargs, svg_path):
+    png_path = make_scratch_path(".png")
+    try:
+        image.save(png_path, "PNG", compress_level=1)
+        vtracer.convert_image_to_svg_py(png_path, svg_path, **vtracer_kwargs)
+    finally:
+        remove_scratch_file(png_path)
+
+DEFAULT_STAGES = {
+    "decode": decode_image,
+    "segment": remove_background,
+    "preprocess": preprocess_image,
+    "resize": resize_image,
+    "trace": trace_image,
+    "write": write_svg_stream,
+}
+
+def _report_failure(result, verbose):
+    if verbose:
+        print(f"  エラー: {os.path.basename(result['input_path'])} - {result['error']} (段階: {result['stage']})")
+        print(f"    処理時間: {format_time(result['elapsed'])}")
+
+def _record_failure(result, timer, error, verbose):
+    timer.stop()
+    result["error"] = str(error)
+    result["elapsed"] = timer.elapsed()
+    _report_failure(result, verbose)
+    return result
+
+def _report_completion(result, verbose):
+    if not verbose:
+        return
+
+    svg_filename = os.path.basename(result["output_path"])
+    size_comparison = compare_sizes(result["input_size"], result["output_size"])
+    if size_comparison:
+        print(f"  完了: {svg_filename}")
+        print(f"    ファイルサイズ: {size_comparison['input_size']} → {size_comparison['output_size']}")
+        if size_comparison['size_reduction']:
+            print(f"    圧縮率: {size_comparison['compression_ratio']:.1f}%削減")
+        else:
+            print(f"    サイズ変化: {abs(size_comparison['compression_ratio']):.1f}%増加")
+    else:
+        print(f"  完了: {svg_filename}")
+    print(f"    処理時間: {format_time(result['elapsed'])}")
+
+class ConversionEngine:
+    def __init__(self, stages=None):
+        stages = dict(DEFAULT_STAGES, **(stages or {}))
+        unknown = sorted(set(stages) - set(STAGE_NAMES))
+        if unknown:
+            raise ValueError(f"不明な処理段階: {', '.join(unknown)} (選択肢: {', '.join(STAGE_NAMES)})")
+        self.stages = stages
+
+    def with_stages(self, **stages):
+        return ConversionEngine(dict(self.stages, **stages))
+
+    def _trace_with_preset(self, image_with_no_bg, result, config, preset, verbose, enter_stage):
+        processor = get_image_processor(preset)
+
+        region = None
+        if config["processing"]["roi_crop"] and not preset.preprocessing.enabled:
+            enter_stage(result, "crop")
+            region = processor.find_foreground_region(image_with_no_bg, config["processing"]["roi_margin"])
+            if region:
+                image_with_no_bg = image_with_no_bg.crop(region["crop_box"])
+                if verbose:
+                    canvas_width, canvas_height = region["canvas_size"]
+                    coverage = region["size"][0] * region["size"][1] / (canvas_width * canvas_height) * 100
+                    print(f"  前景領域: {region['size'][0]}x{region['size'][1]} ({coverage:.1f}%)")
+
+        enter_stage(result, "preprocess")
+        processed_image = self.stages["preprocess"](image_with_no_bg, processor, verbose)
+
+        enter_stage(result, "resize")
+        resized_image = self.stages["resize"](processed_image, processor, region, verbose)
+
+        enter_stage(result, "trace")
+        if verbose:
+            print(f"  SVG変換中...")
+        traced_path = make_scratch_path(SVG_EXTENSION)
+        try:
+            self.stages["trace"](resized_image, preset.vtracer_kwargs, traced_path)
+        except BaseException:
+            remove_scratch_file(traced_path)
+            raise
+        return {
+            "path": traced_path,
+            "canvas": (region["canvas_size"], region["offset"]) if region else None,
+        }
+
+    def _trace_conversion(self, image_with_no_bg, result, config, verbose, enter_stage):
+        preset = config["preset"]
+        while True:
+            traced = self._trace_with_preset(image_with_no_bg, result, config, preset, verbose, enter_stage)
+            try:
+                svg_bytes, svg_paths = scan_svg_file(traced["path"], config["svg_output"]["chunk_size"])
+            except BaseException:
+                remove_scratch_file(traced["path"])
+                raise
+            exceeded = check_svg_limits(svg_bytes, svg_paths, config["limits"])
+            if not exceeded:
+                break
+            remove_scratch_file(traced["path"])
+
+            fallback = config["svg_output"]["fallback_presets"].get(preset.key)
+            if not fallback:
+                raise RuntimeError(f"{exceeded} (より粗いプリセットがありません)")
+            if verbose:
+                print(f"  警告: {exceeded}。'{fallback}' プリセットで再トレースします")
+            preset = get_compiled_preset(fallback)
+            result["fallback_preset"] = fallback
+
+        result["svg_paths"] = svg_paths
+        return traced
+
+    def trace_batch(self, items, config, verbose=True, stage_callback=None):
+        processor = get_image_processor(config["preset"])
+
+        def enter_stage(result, stage):
+            result["stage"] = stage
+            if stage_callback:
+                stage_callback(stage)
+
+        decoded = []
+        for input_path, input_data in items:
+            if verbose:
+                print(f"\n処理中: {os.path.basename(input_path)}")
+
+            timer = ProcessingTimer()
+            timer.start()
+            result = {
+                "input_path": input_path,
+                "success": False,
+                "stage": None,
+                "input_hash": None,
+                "output_path": None,
+                "input_size": None,
+                "image_size": None,
+                "output_size": None,
+                "svg_paths": None,
+                "fallback_preset": None,
+                "analysis": None,
+                "elapsed": 0,
+            }
+
+            try:
+                enter_stage(result, "decode")
+                if input_data is None:
+                    input_data = read_file(input_path)
+                original_image = self.stages["decode"](input_data)
+                result["input_hash"] = compute_data_hash(input_data)
+                result["input_size"] = len(input_data)
+                result["image_size"] = list(original_image.size)
+
+                if config["processing"]["enable_quality_analysis"]:
+                    enter_stage(result, "analyze")
+                    result["analysis"] = processor.analyze_image_quality(original_image, config["quality_analysis"])
+                    if verbose:
+                        print_quality_analysis(result["analysis"])
+
+                decoded.append((result, timer, original_image))
+            except Exception as e:
+                yield _record_failure(result, timer, e, verbose), None
+
+        if not decoded:
+            return
+
+        for result, _, _ in decoded:
+            result["stage"] = "segment"
+        if stage_callback:
+            stage_callback("segment")
+
+        try:
+            images_with_no_bg = self.stages["segment"](
+                [image for _, _, image in decoded], config["rembg"], verbose
+            )
+        except Exception as e:
+            for result, timer, _ in decoded:
+                yield _record_failure(result, timer, e, verbose), None
+            return
+
+        for (result, timer, _), image_with_no_bg in zip(decoded, images_with_no_bg):
+            try:
+                traced = self._trace_conversion(image_with_no_bg, result, config, verbose, enter_stage)
+            except Exception as e:
+                yield _record_failure(result, timer, e, verbose), None
+                continue
+            timer.stop()
+            result["elapsed"] = timer.elapsed()
+            yield result, traced
+
+    def write_output(self, result, traced, config, verbose=True):
+        timer = ProcessingTimer()
+        timer.start()
+        result["stage"] = "write"
+        try:
+            svg_path = get_output_path(
+                result["input_path"], config["base_dirs"]["output"], get_svg_extension(config["svg_output"])
+            )
+            result["output_size"] = self.stages["write"](
+                traced["path"], svg_path, config["svg_output"], traced["canvas"]
+            )
+            result["output_path"] = svg_path
+            result["success"] = True
+        except OSError as e:
+            result["error"] = str(e)
+        finally:
+            remove_scratch_file(traced["path"])
+        timer.stop()
+        result["elapsed"] += timer.elapsed()
+
+        if result["success"]:
+            _report_completion(result, verbose)
+        else:
+            _report_failure(result, verbose)
+        return result
+
+    def convert_items(self, items, config, verbose=True, stage_callback=None):
+        for result, traced in self.trace_batch(items, config, verbose, stage_callback):
+            if traced is not None:
+                if stage_callback:
+                    stage_callback("write")
+                self.write_output(result, traced, config, verbose)
+            yield result
+
+    def convert_batch(self, input_paths, config, verbose=True, stage_callback=None):
+        return self.convert_items([(input_path, None) for input_path in input_paths], config, verbose, stage_callback)
+
+    def convert_to_svg(self, input_path, config, verbose=True, stage_callback=None):
+        return next(self.convert_batch([input_path], config, verbose, stage_callback))
+
+    def profiled_convert_items(self, items, config, verbose=True, stage_callback=None):
+        for item in items:
+            (result,), stats = profile_call(list, self.convert_items([item], config, verbose, stage_callback))
+            result["profile"] = stats
+            yield result
+
+DEFAULT_ENGINE = ConversionEngine()
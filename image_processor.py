@@ -1,15 +1,25 @@
+import math
 import cv2
 import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
-from quality_presets import get_preprocessing_config
+
+from config import QUALITY_ANALYSIS_CONFIG
+
+_processors = {}
 
 class ImageProcessor:
-    def __init__(self, preset_config):
-        self.config = preset_config
-        self.preprocessing_config = get_preprocessing_config()
+    def __init__(self, preset):
+        self.preset = preset
+        self.preprocessing = preset.preprocessing
+        self.image_resize = preset.image_resize
+        self.sharpening_kernel = np.array(self.preprocessing.laplacian_kernel, dtype=np.float32)
+        self.clahe = cv2.createCLAHE(
+            clipLimit=self.preprocessing.clahe_clip_limit,
+            tileGridSize=self.preprocessing.clahe_tile_grid_size
+        )
         
     def process_image(self, image, verbose=True):
-        if not self.config["preprocessing"]["enabled"]:
+        if not self.preprocessing.enabled:
             if verbose:
                 print("  前処理スキップ")
             return image
@@ -19,16 +29,16 @@ class ImageProcessor:
             
         processed_image = image.copy()
         
-        if self.config["preprocessing"].get("noise_reduction", False):
+        if self.preprocessing.noise_reduction:
             processed_image = self._apply_noise_reduction(processed_image, verbose)
             
-        if self.config["preprocessing"].get("contrast_enhancement", False):
+        if self.preprocessing.contrast_enhancement:
             processed_image = self._apply_contrast_enhancement(processed_image, verbose)
             
-        if self.config["preprocessing"].get("sharpening", False):
+        if self.preprocessing.sharpening:
             processed_image = self._apply_sharpening(processed_image, verbose)
             
-        if self.config["preprocessing"].get("edge_enhancement", False):
+        if self.preprocessing.edge_enhancement:
             processed_image = self._apply_edge_enhancement(processed_image, verbose)
             
         if verbose:
@@ -42,12 +52,11 @@ class ImageProcessor:
             
         cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
         
-        bilateral_config = self.preprocessing_config["noise_reduction"]["bilateral_filter"]
         denoised = cv2.bilateralFilter(
             cv_image,
-            bilateral_config["d"],
-            bilateral_config["sigma_color"],
-            bilateral_config["sigma_space"]
+            self.preprocessing.bilateral_d,
+            self.preprocessing.bilateral_sigma_color,
+            self.preprocessing.bilateral_sigma_space
         )
         
         rgb_image = cv2.cvtColor(denoised, cv2.COLOR_BGR2RGB)
@@ -62,13 +71,7 @@ class ImageProcessor:
         lab = cv2.cvtColor(cv_image, cv2.COLOR_BGR2LAB)
         l_channel, a_channel, b_channel = cv2.split(lab)
         
-        clahe_config = self.preprocessing_config["contrast_enhancement"]["clahe"]
-        clahe = cv2.createCLAHE(
-            clipLimit=clahe_config["clip_limit"],
-            tileGridSize=clahe_config["tile_grid_size"]
-        )
-        
-        l_channel = clahe.apply(l_channel)
+        l_channel = self.clahe.apply(l_channel)
         
         enhanced = cv2.merge([l_channel, a_channel, b_channel])
         enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
@@ -82,8 +85,7 @@ class ImageProcessor:
             
         cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
         
-        kernel = np.array(self.preprocessing_config["sharpening"]["laplacian_kernel"], dtype=np.float32)
-        sharpened = cv2.filter2D(cv_image, -1, kernel)
+        sharpened = cv2.filter2D(cv_image, -1, self.sharpening_kernel)
         
         rgb_image = cv2.cvtColor(sharpened, cv2.COLOR_BGR2RGB)
         pil_image = Image.fromarray(np.clip(rgb_image, 0, 255).astype(np.uint8))
@@ -102,16 +104,32 @@ class ImageProcessor:
         
         return enhanced
     
+    def get_target_size(self, image_size):
+        resize_config = self.image_resize
+        width, height = image_size
+        max_width = resize_config.max_width
+        max_height = resize_config.max_height
+        
+        if not resize_config.enabled or max_width is None or max_height is None:
+            return image_size
+        if width <= max_width and height <= max_height:
+            return image_size
+        
+        if resize_config.maintain_aspect_ratio:
+            ratio = min(max_width / width, max_height / height)
+            return int(width * ratio), int(height * ratio)
+        return min(width, max_width), min(height, max_height)
+    
     def resize_image(self, image, verbose=True):
-        resize_config = self.config["image_resize"]
+        resize_config = self.image_resize
         
-        if not resize_config["enabled"]:
+        if not resize_config.enabled:
             if verbose:
                 print("  リサイズスキップ（無制限モード）")
             return image
             
-        max_width = resize_config["max_width"]
-        max_height = resize_config["max_height"]
+        max_width = resize_config.max_width
+        max_height = resize_config.max_height
         
         if max_width is None or max_height is None:
             if verbose:
@@ -125,49 +143,94 @@ class ImageProcessor:
                 print(f"  リサイズ不要 ({width}x{height})")
             return image
         
-        if resize_config["maintain_aspect_ratio"]:
-            ratio = min(max_width / width, max_height / height)
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-        else:
-            new_width = min(width, max_width)
-            new_height = min(height, max_height)
+        new_width, new_height = self.get_target_size(image.size)
         
         if verbose:
             print(f"  リサイズ: {width}x{height} → {new_width}x{new_height}")
             
         return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
     
-    def estimate_processing_time(self, image_size):
-        width, height = image_size
+    def find_foreground_region(self, image, margin=0):
+        if "A" not in image.getbands():
+            return None
+        bbox = image.getchannel("A").getbbox()
+        if bbox is None:
+            return None
+        
+        width, height = image.size
+        canvas_width, canvas_height = self.get_target_size(image.size)
+        scale_x = canvas_width / width
+        scale_y = canvas_height / height
+        
+        left, top, right, bottom = bbox
+        x0 = max(0, math.floor((left - margin) * scale_x))
+        y0 = max(0, math.floor((top - margin) * scale_y))
+        x1 = min(canvas_width, math.ceil((right + margin) * scale_x))
+        y1 = min(canvas_height, math.ceil((bottom + margin) * scale_y))
+        if (x1 - x0) * (y1 - y0) >= canvas_width * canvas_height:
+            return None
+        
+        crop_box = (
+            max(0, math.floor(x0 / scale_x)),
+            max(0, math.floor(y0 / scale_y)),
+            min(width, math.ceil(x1 / scale_x)),
+            min(height, math.ceil(y1 / scale_y)),
+        )
+        return {
+            "canvas_size": (canvas_width, canvas_height),
+            "offset": (x0, y0),
+            "size": (x1 - x0, y1 - y0),
+            "crop_box": crop_box,
+            "resize_box": (
+                x0 / scale_x - crop_box[0],
+                y0 / scale_y - crop_box[1],
+                x1 / scale_x - crop_box[0],
+                y1 / scale_y - crop_box[1],
+            ),
+        }
+    
+    def resize_region(self, image, region, verbose=True):
+        if image.size == region["size"]:
+            if verbose:
+                print(f"  リサイズ不要 ({image.width}x{image.height})")
+            return image
+        
+        if verbose:
+            print(f"  リサイズ: {image.width}x{image.height} → {region['size'][0]}x{region['size'][1]}")
+        return image.resize(region["size"], Image.Resampling.LANCZOS, box=region["resize_box"])
+    
+    def estimate_processing_cost(self, image_size):
+        width, height = self.get_target_size(image_size)
         pixels = width * height
         
         base_time = pixels / 1000000
         
-        if self.config["preprocessing"]["enabled"]:
-            if self.config["preprocessing"].get("noise_reduction", False):
+        if self.preprocessing.enabled:
+            if self.preprocessing.noise_reduction:
                 base_time *= 1.5
-            if self.config["preprocessing"].get("contrast_enhancement", False):
+            if self.preprocessing.contrast_enhancement:
                 base_time *= 1.3
-            if self.config["preprocessing"].get("sharpening", False):
+            if self.preprocessing.sharpening:
                 base_time *= 1.2
-            if self.config["preprocessing"].get("edge_enhancement", False):
+            if self.preprocessing.edge_enhancement:
                 base_time *= 1.1
                 
-        return int(base_time * 10)
+        return base_time
     
-    def analyze_image_quality(self, image):
-        cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
+    def estimate_processing_time(self, image_size):
+        return int(self.estimate_processing_cost(image_size) * 10)
+    
+    def analyze_image_quality(self, image, analysis_config=QUALITY_ANALYSIS_CONFIG):
+        gray = create_analysis_thumbnail(image, analysis_config["thumbnail_size"])
         
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        laplacian_var = float(compute_laplacian_variance(gray))
         
-        blur_level = "低" if laplacian_var < 100 else "中" if laplacian_var < 500 else "高"
+        blur_level = classify_level(laplacian_var, analysis_config["blur_thresholds"])
         
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        contrast = hist.std()
+        width, height = image.size
+        contrast = float(compute_histogram_contrast(gray, width * height))
         
-        contrast_level = "低" if contrast < 50 else "中" if contrast < 100 else "高"
+        contrast_level = classify_level(contrast, analysis_config["contrast_thresholds"])
         
         return {
             "sharpness": laplacian_var,
@@ -175,4 +238,68 @@ class ImageProcessor:
             "contrast": contrast,
             "contrast_level": contrast_level,
             "size": image.size
-        }
\ No newline at end of file
+        }
+
+def get_image_processor(preset):
+    if preset.cache_key not in _processors:
+        _processors[preset.cache_key] = ImageProcessor(preset)
+    return _processors[preset.cache_key]
+
+def classify_level(value, thresholds):
+    low, high = thresholds
+    return "低" if value < low else "中" if value < high else "高"
+
+def shrink_for_analysis(image, thumbnail_size=QUALITY_ANALYSIS_CONFIG["thumbnail_size"]):
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return image
+
+def get_thumbnail_size(image_size, thumbnail_size):
+    width, height = image_size
+    if width <= thumbnail_size and height <= thumbnail_size:
+        return image_size
+    aspect = width / height
+    if aspect >= 1:
+        height = min((math.floor(thumbnail_size / aspect), math.ceil(thumbnail_size / aspect)),
+                     key=lambda n: 0 if n == 0 else abs(aspect - thumbnail_size / n))
+        return thumbnail_size, max(height, 1)
+    width = min((math.floor(thumbnail_size * aspect), math.ceil(thumbnail_size * aspect)),
+                key=lambda n: abs(aspect - n / thumbnail_size))
+    return max(width, 1), thumbnail_size
+
+def create_analysis_thumbnail(image, thumbnail_size=QUALITY_ANALYSIS_CONFIG["thumbnail_size"]):
+    size = get_thumbnail_size(image.size, thumbnail_size)
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return np.asarray(image.convert("L"), dtype=np.float32)
+
+def valid_pixel_mask(sizes, shape, border=0):
+    rows = np.arange(shape[0])[None, :, None]
+    cols = np.arange(shape[1])[None, None, :]
+    return (rows < sizes[:, 1, None, None] - border) & (cols < sizes[:, 0, None, None] - border)
+
+def compute_laplacian_variance(gray, sizes=None):
+    laplacian = (
+        gray[..., :-2, 1:-1] + gray[..., 2:, 1:-1]
+        + gray[..., 1:-1, :-2] + gray[..., 1:-1, 2:]
+        - 4 * gray[..., 1:-1, 1:-1]
+    )
+    if sizes is None:
+        return laplacian.var(axis=(-2, -1))
+    
+    valid = valid_pixel_mask(sizes, laplacian.shape[-2:], border=2)
+    count = np.maximum(valid.sum(axis=(1, 2)), 1)
+    mean = np.where(valid, laplacian, 0).sum(axis=(1, 2), dtype=np.float64) / count
+    deviation = np.where(valid, laplacian - mean[:, None, None], 0)
+    return np.square(deviation, dtype=np.float64).sum(axis=(1, 2)) / count
+
+def compute_histogram_contrast(gray, original_pixels, sizes=None):
+    levels = gray.astype(np.uint8).reshape(-1, gray.shape[-2] * gray.shape[-1]).astype(np.int64)
+    if sizes is None:
+        pixels = gray.shape[-2] * gray.shape[-1]
+    else:
+        levels[~valid_pixel_mask(sizes, gray.shape[-2:]).reshape(len(levels), -1)] = 256
+        pixels = sizes[:, 0] * sizes[:, 1]
+    levels += np.arange(len(levels))[:, None] * 257
+    hist = np.bincount(levels.ravel(), minlength=len(levels) * 257).reshape(-1, 257)[:, :256]
+    contrast = hist.std(axis=1) * original_pixels / pixels
+    return contrast.reshape(gray.shape[:-2])
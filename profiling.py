@@ -0,0 +1,112 @@
+import os
+import heapq
+import marshal
+import cProfile
+
+from utils import write_text_atomic, format_time
+
+def profile_call(func, *args, **kwargs):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        value = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return value, profiler.stats
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == "~":
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+def collapse_stacks(stats, min_fraction=1e-4):
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, edge_time) in callers.items():
+            callees.setdefault(caller, []).append((func, edge_time))
+
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    min_time = sum(stats[func][3] for func in roots) * min_fraction
+    stacks = {}
+
+    def walk(func, path, visiting, total):
+        _, _, self_time, cumulative_time, _ = stats[func]
+        scale = total / cumulative_time if cumulative_time > 0 else 0
+        path = path + [_frame_label(func)]
+        visiting.add(func)
+
+        if self_time * scale >= min_time:
+            stack = ";".join(path)
+            stacks[stack] = stacks.get(stack, 0) + self_time * scale
+        for callee, edge_time in callees.get(func, ()):
+            if callee not in visiting and edge_time * scale >= min_time:
+                walk(callee, path, visiting, edge_time * scale)
+
+        visiting.discard(func)
+
+    for func in roots:
+        if stats[func][3] >= min_time:
+            walk(func, [], set(), stats[func][3])
+
+    return [(stack, round(seconds * 1e6)) for stack, seconds in sorted(stacks.items())]
+
+def write_profile(stats, base_path):
+    prof_path = f"{base_path}.prof"
+    with open(prof_path, "wb") as prof_file:
+        marshal.dump(stats, prof_file)
+
+    collapsed_path = f"{base_path}.collapsed.txt"
+    write_text_atomic(
+        collapsed_path,
+        "".join(f"{stack} {microseconds}\n" for stack, microseconds in collapse_stacks(stats) if microseconds > 0)
+    )
+    return prof_path, collapsed_path
+
+class ProfileCollector:
+    def __init__(self, output_dir, keep_slowest=10):
+        self.output_dir = output_dir
+        self.keep_slowest = max(1, keep_slowest)
+        self.profiles = []
+        self.profiled_count = 0
+
+    def add(self, result):
+        stats = result.pop("profile", None)
+        if stats is None:
+            return
+
+        entry = (result["elapsed"], self.profiled_count, result["input_path"], stats)
+        self.profiled_count += 1
+        if len(self.profiles) < self.keep_slowest:
+            heapq.heappush(self.profiles, entry)
+        else:
+            heapq.heappushpop(self.profiles, entry)
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith((".prof", ".collapsed.txt")):
+                    os.remove(entry.path)
+
+        written = []
+        for rank, (elapsed, _, input_path, stats) in enumerate(sorted(self.profiles, reverse=True), 1):
+            name = os.path.splitext(os.path.basename(input_path))[0]
+            base_path = os.path.join(self.output_dir, f"{rank:03d}_{name}")
+            prof_path, collapsed_path = write_profile(stats, base_path)
+            written.append({
+                "input_path": input_path,
+                "elapsed": elapsed,
+                "prof_path": prof_path,
+                "collapsed_path": collapsed_path,
+            })
+        return written
+
+    def print_report(self, written):
+        print(f"\nプロファイル: {self.profiled_count}件中、処理時間の長い{len(written)}件を出力しました")
+        print(f"  出力先: {self.output_dir}")
+        for entry in written:
+            print(f"  {os.path.basename(entry['input_path'])}: {format_time(entry['elapsed'])} → {os.path.basename(entry['prof_path'])}")
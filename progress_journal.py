@@ -0,0 +1,91 @@
+import os
+import json
+import time
+from utils import compute_file_hash
+
+TAIL_BLOCK_SIZE = 4096
+
+class ProgressJournal:
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.entries = {}
+        self._file = None
+        
+    def load(self):
+        self.entries = {}
+        if not os.path.exists(self.journal_path):
+            return 0
+        
+        with open(self.journal_path, "rb") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[entry["input_path"]] = entry
+        
+        return len(self.entries)
+    
+    def _drop_partial_tail(self):
+        end = self._file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - TAIL_BLOCK_SIZE)
+            self._file.seek(start)
+            newline = self._file.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            self._file.truncate(position)
+    
+    def open(self, resume=False):
+        if not resume:
+            self.entries = {}
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+                os.replace(self.journal_path, f"{self.journal_path}.1")
+        
+        self._file = open(self.journal_path, "ab+")
+        self._drop_partial_tail()
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+    
+    def record(self, result, preset):
+        entry = {
+            "input_path": result["input_path"],
+            "input_hash": result.get("input_hash"),
+            "status": "success" if result["success"] else "failed",
+            "output_path": result.get("output_path"),
+            "elapsed": round(result["elapsed"], 3),
+            "image_size": result.get("image_size"),
+            "quality_preset": preset.key,
+            "preset_key": preset.cache_key,
+            "analysis": result.get("analysis"),
+            "timestamp": time.time(),
+        }
+        if not result["success"]:
+            entry["stage"] = result.get("stage")
+            entry["failure"] = result.get("failure", "error")
+            entry["error"] = result.get("error")
+        
+        self._file.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[entry["input_path"]] = entry
+    
+    def is_completed(self, input_path, preset=None):
+        entry = self.entries.get(input_path)
+        if not entry or entry["status"] != "success":
+            return False
+        if preset and entry.get("preset_key") != preset.cache_key:
+            return False
+        if not entry.get("output_path") or not os.path.exists(entry["output_path"]):
+            return False
+        try:
+            return compute_file_hash(input_path) == entry["input_hash"]
+        except OSError:
+            return False
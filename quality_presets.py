@@ -1,4 +1,47 @@
 QUALITY_PRESETS = {
+    "express": {
+        "name": "エクスプレス品質",
+        "description": "int8量子化モデルによる最速処理（要 quantize_models.py）",
+        "image_resize": {
+            "enabled": True,
+            "max_width": 512,
+            "max_height": 512,
+            "maintain_aspect_ratio": True,
+        },
+        "preprocessing": {
+            "enabled": False,
+            "noise_reduction": False,
+            "sharpening": False,
+            "contrast_enhancement": False,
+        },
+        "rembg": {
+            "model": "u2net_int8",
+            "alpha_matting": False,
+            "alpha_matting_foreground_threshold": 240,
+            "alpha_matting_background_threshold": 50,
+            "alpha_matting_erode_size": 10,
+        },
+        "vtracer": {
+            "colormode": "color",
+            "hierarchical": "stacked",
+            "mode": "spline",
+            "filter_speckle": 8,
+            "color_precision": 4,
+            "layer_difference": 32,
+            "corner_threshold": 40,
+            "length_threshold": 6.0,
+            "max_iterations": 5,
+            "splice_threshold": 60,
+            "path_precision": 6,
+        },
+        "limits": {
+            "timeout": 120,
+            "max_rss_mb": 2048,
+            "max_svg_paths": 50000,
+            "max_svg_mb": 64,
+        }
+    },
+    
     "draft": {
         "name": "ドラフト品質",
         "description": "高速処理優先、基本品質",
@@ -33,6 +76,12 @@ QUALITY_PRESETS = {
             "max_iterations": 5,
             "splice_threshold": 60,
             "path_precision": 6,
+        },
+        "limits": {
+            "timeout": 120,
+            "max_rss_mb": 2048,
+            "max_svg_paths": 50000,
+            "max_svg_mb": 64,
         }
     },
     
@@ -70,6 +119,12 @@ QUALITY_PRESETS = {
             "max_iterations": 10,
             "splice_threshold": 45,
             "path_precision": 8,
+        },
+        "limits": {
+            "timeout": 300,
+            "max_rss_mb": 3072,
+            "max_svg_paths": 100000,
+            "max_svg_mb": 128,
         }
     },
     
@@ -91,7 +146,7 @@ QUALITY_PRESETS = {
         "rembg": {
             "model": "u2net",
             "alpha_matting": True,
-            "alpha_matting_foreground_threshold": 270,
+            "alpha_matting_foreground_threshold": 255,
             "alpha_matting_background_threshold": 20,
             "alpha_matting_erode_size": 5,
         },
@@ -107,6 +162,12 @@ QUALITY_PRESETS = {
             "max_iterations": 15,
             "splice_threshold": 30,
             "path_precision": 10,
+        },
+        "limits": {
+            "timeout": 600,
+            "max_rss_mb": 4096,
+            "max_svg_paths": 200000,
+            "max_svg_mb": 256,
         }
     },
     
@@ -129,7 +190,7 @@ QUALITY_PRESETS = {
         "rembg": {
             "model": "u2netp",
             "alpha_matting": True,
-            "alpha_matting_foreground_threshold": 270,
+            "alpha_matting_foreground_threshold": 255,
             "alpha_matting_background_threshold": 15,
             "alpha_matting_erode_size": 3,
         },
@@ -145,6 +206,12 @@ QUALITY_PRESETS = {
             "max_iterations": 20,
             "splice_threshold": 20,
             "path_precision": 12,
+        },
+        "limits": {
+            "timeout": 1800,
+            "max_rss_mb": 8192,
+            "max_svg_paths": 400000,
+            "max_svg_mb": 512,
         }
     }
 }
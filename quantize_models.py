@@ -0,0 +1,97 @@
+import os
+import argparse
+import tempfile
+
+from config import INPUT_DIR, SUPPORTED_FORMATS
+from segmentation import (
+    QUANTIZABLE_MODELS,
+    create_session,
+    get_model_path,
+    get_quantized_model_path,
+    prepare_segmentation_inputs,
+)
+from utils import format_file_size
+from engine import load_image, get_image_files
+
+def create_calibration_reader(image_files, input_name):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class SegmentationCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.image_files = iter(image_files)
+
+        def get_next(self):
+            image_path = next(self.image_files, None)
+            if image_path is None:
+                return None
+            image, _ = load_image(image_path)
+            return {input_name: prepare_segmentation_inputs([image])}
+
+    return SegmentationCalibrationReader()
+
+def quantize_model(model_name, method, calibration_files):
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    session = create_session(model_name)
+    input_name = session.inner_session.get_inputs()[0].name
+    source_path = get_model_path(model_name)
+    output_path = get_quantized_model_path(model_name)
+
+    if method == "dynamic":
+        quantize_dynamic(source_path, output_path, weight_type=QuantType.QUInt8)
+        return source_path, output_path
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        preprocessed_path = os.path.join(temp_dir, f"{model_name}_preprocessed.onnx")
+        quant_pre_process(source_path, preprocessed_path, skip_symbolic_shape=True)
+        quantize_static(
+            preprocessed_path,
+            output_path,
+            create_calibration_reader(calibration_files, input_name),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    return source_path, output_path
+
+def main():
+    parser = argparse.ArgumentParser(description="背景除去モデルのint8量子化")
+    parser.add_argument("--models", nargs="+", choices=QUANTIZABLE_MODELS, default=list(QUANTIZABLE_MODELS),
+                       help="量子化するモデル (デフォルト: u2net u2netp)")
+    parser.add_argument("--method", choices=["static", "dynamic"], default="static",
+                       help="量子化方式 (static: キャリブレーション画像を使用, dynamic: 重みのみ)")
+    parser.add_argument("--calibration-dir", default=os.path.join(INPUT_DIR, "images"),
+                       help="キャリブレーション用の画像フォルダ")
+    parser.add_argument("--calibration-limit", type=int, default=32,
+                       help="キャリブレーションに使用する最大画像枚数")
+
+    args = parser.parse_args()
+
+    try:
+        import onnxruntime.quantization
+    except ImportError:
+        print("エラー: 量子化には onnx パッケージが必要です (pip install onnx)")
+        return
+
+    calibration_files = []
+    if args.method == "static":
+        calibration_files = sorted(
+            str(path) for path in get_image_files(args.calibration_dir, SUPPORTED_FORMATS)
+        )[:args.calibration_limit]
+        if not calibration_files:
+            print(f"エラー: キャリブレーション画像が見つかりません: {args.calibration_dir}")
+            return
+        print(f"キャリブレーション画像: {len(calibration_files)}枚")
+
+    for model_name in args.models:
+        print(f"\n量子化中: {model_name} ({args.method})")
+        source_path, output_path = quantize_model(model_name, args.method, calibration_files)
+        print(f"  完了: {output_path}")
+        print(f"    モデルサイズ: {format_file_size(os.path.getsize(source_path))} → {format_file_size(os.path.getsize(output_path))}")
+
+    print("\n精度と速度の比較: python benchmark.py quantization")
+
+if __name__ == "__main__":
+    main()
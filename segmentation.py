@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+from rembg import remove
+from rembg.bg import alpha_matting_cutout, naive_cutout, fix_image_orientation
+from rembg.sessions import sessions_class
+from rembg.sessions.u2net import U2netSession
+from rembg.sessions.base import BaseSession
+
+from thread_budget import get_thread_budget
+
+QUANTIZED_SUFFIX = "_int8"
+QUANTIZABLE_MODELS = ("u2net", "u2netp")
+BATCHABLE_MODELS = QUANTIZABLE_MODELS + tuple(f"{name}{QUANTIZED_SUFFIX}" for name in QUANTIZABLE_MODELS)
+
+SEGMENTATION_INPUT_SIZE = (320, 320)
+SEGMENTATION_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+SEGMENTATION_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+_sessions = {}
+
+def get_model_path(model_name):
+    return os.path.join(BaseSession.u2net_home(), f"{model_name}.onnx")
+
+def get_quantized_model_path(model_name):
+    return get_model_path(f"{model_name}{QUANTIZED_SUFFIX}")
+
+class QuantizedU2netSession(U2netSession):
+    @classmethod
+    def download_models(cls, *args, **kwargs):
+        model_path = get_model_path(kwargs["quantized_model"])
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"量子化モデルが見つかりません: {model_path} "
+                f"('python quantize_models.py' で生成してください)"
+            )
+        return model_path
+
+def create_session(model_name, threads=None):
+    session_class = U2netSession
+    for candidate in sessions_class:
+        if candidate.name() == model_name:
+            session_class = candidate
+            break
+    
+    kwargs = {}
+    if model_name.endswith(QUANTIZED_SUFFIX):
+        session_class = QuantizedU2netSession
+        kwargs["quantized_model"] = model_name
+    
+    sess_opts = ort.SessionOptions()
+    if threads:
+        sess_opts.intra_op_num_threads = threads
+        sess_opts.inter_op_num_threads = 1
+    
+    return session_class(model_name, sess_opts, None, **kwargs)
+
+def get_session(model_name):
+    threads = get_thread_budget()
+    key = (model_name, threads)
+    if key not in _sessions:
+        _sessions[key] = create_session(model_name, threads)
+    return _sessions[key]
+
+def get_max_batch_size(session):
+    batch_dim = session.inner_session.get_inputs()[0].shape[0]
+    if isinstance(batch_dim, int) and batch_dim > 0:
+        return batch_dim
+    return None
+
+def prepare_segmentation_inputs(images):
+    batch = np.stack([
+        np.asarray(image.convert("RGB").resize(SEGMENTATION_INPUT_SIZE, Image.Resampling.LANCZOS), dtype=np.float32)
+        for image in images
+    ])
+    batch /= np.maximum(batch.max(axis=(1, 2, 3), keepdims=True), 1e-6)
+    batch = (batch - SEGMENTATION_MEAN) / SEGMENTATION_STD
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+
+def run_segmentation(session, inputs):
+    input_name = session.inner_session.get_inputs()[0].name
+    max_batch_size = get_max_batch_size(session) or len(inputs)
+    
+    predictions = []
+    for start in range(0, len(inputs), max_batch_size):
+        outputs = session.inner_session.run(None, {input_name: inputs[start:start + max_batch_size]})
+        predictions.append(outputs[0][:, 0, :, :])
+    return np.concatenate(predictions)
+
+def predictions_to_masks(predictions, images):
+    low = predictions.min(axis=(1, 2), keepdims=True)
+    high = predictions.max(axis=(1, 2), keepdims=True)
+    normalized = (predictions - low) / np.maximum(high - low, 1e-6)
+    
+    masks = []
+    for prediction, image in zip(normalized, images):
+        mask = Image.fromarray((prediction * 255).astype(np.uint8), mode="L")
+        masks.append(mask.resize(image.size, Image.Resampling.LANCZOS))
+    return masks
+
+def apply_mask(image, mask, rembg_config):
+    if rembg_config.alpha_matting:
+        try:
+            return alpha_matting_cutout(
+                image,
+                mask,
+                rembg_config.alpha_matting_foreground_threshold,
+                rembg_config.alpha_matting_background_threshold,
+                rembg_config.alpha_matting_erode_size,
+            )
+        except ValueError:
+            pass
+    return naive_cutout(image, mask)
+
+def segment_images(images, rembg_config):
+    session = get_session(rembg_config.model)
+    
+    if rembg_config.model not in BATCHABLE_MODELS:
+        return [
+            remove(
+                image,
+                session=session,
+                alpha_matting=rembg_config.alpha_matting,
+                alpha_matting_foreground_threshold=rembg_config.alpha_matting_foreground_threshold,
+                alpha_matting_background_threshold=rembg_config.alpha_matting_background_threshold,
+                alpha_matting_erode_size=rembg_config.alpha_matting_erode_size,
+            )
+            for image in images
+        ]
+    
+    images = [fix_image_orientation(image) for image in images]
+    predictions = run_segmentation(session, prepare_segmentation_inputs(images))
+    masks = predictions_to_masks(predictions, images)
+    return [apply_mask(image, mask, rembg_config) for image, mask in zip(images, masks)]
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import argparse
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+from config import OUTPUT_DIR, SPRITE_CONFIG
+from utils import ProcessingTimer, write_text_atomic, make_temp_path
+from svg_writer import SVG_EXTENSION, COMPRESSED_SVG_EXTENSION, open_svg
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+HEX_COLOR_PATTERN = re.compile(r"^#(?:[0-9a-fA-F]{3}){1,2}$")
+INDEX_VERSION = 1
+
+def make_symbol_id(name):
+    symbol_id = re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    if not symbol_id[:1].isalpha():
+        symbol_id = f"s-{symbol_id}"
+    return symbol_id
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def _format_attributes(attributes):
+    return "".join(f" {name}={quoteattr(value)}" for name, value in attributes)
+
+def _get_viewbox(root_attributes):
+    if "viewBox" in root_attributes:
+        return root_attributes["viewBox"]
+    width = re.sub(r"[^0-9.]", "", root_attributes.get("width", "0")) or "0"
+    height = re.sub(r"[^0-9.]", "", root_attributes.get("height", "0")) or "0"
+    return f"0 0 {width} {height}"
+
+def convert_svg_to_symbol(svg_path, symbol_id, palette):
+    parts = []
+    colors = set()
+    viewbox = None
+    depth = 0
+
+    with open_svg(svg_path) as svg_file:
+        for event, element in ET.iterparse(svg_file, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    viewbox = _get_viewbox(element.attrib)
+                    continue
+
+                attributes = []
+                for name, value in element.attrib.items():
+                    if name == "fill" and HEX_COLOR_PATTERN.match(value):
+                        color = value.upper()
+                        if color not in palette:
+                            palette[color] = f"c{len(palette):x}"
+                        colors.add(palette[color])
+                        attributes.append(("class", palette[color]))
+                    else:
+                        attributes.append((_local_name(name), value))
+                parts.append(f"<{_local_name(element.tag)}{_format_attributes(attributes)}>")
+            else:
+                depth -= 1
+                if depth == 0:
+                    continue
+                parts.append(f"</{_local_name(element.tag)}>")
+                element.clear()
+
+    fragment = f"<symbol id={quoteattr(symbol_id)} viewBox={quoteattr(viewbox)}>{''.join(parts)}</symbol>"
+    return fragment, viewbox, sorted(colors)
+
+class SpriteBuilder:
+    def __init__(self, source_dir=OUTPUT_DIR, sprite_config=SPRITE_CONFIG, verbose=True):
+        self.source_dir = source_dir
+        self.sprite_dir = sprite_config["output_dir"]
+        self.symbols_per_sheet = sprite_config["symbols_per_sheet"]
+        self.sheet_prefix = sprite_config["sheet_prefix"]
+        self.cache_dir = os.path.join(self.sprite_dir, ".cache")
+        self.index_path = os.path.join(self.sprite_dir, "index.json")
+        self.stylesheet_path = os.path.join(self.sprite_dir, f"{self.sheet_prefix}.css")
+        self.verbose = verbose
+        self.index = {"version": INDEX_VERSION, "palette": {}, "sheets": {}, "symbols": {}, "aliases": {}}
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+        if index.get("version") == INDEX_VERSION:
+            index.setdefault("aliases", {})
+            self.index = index
+
+    def _scan_sources(self):
+        sources = {}
+        aliases = {}
+        duplicates = set()
+        source_dir = os.path.realpath(self.source_dir)
+        with os.scandir(self.source_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith((SVG_EXTENSION, COMPRESSED_SVG_EXTENSION)) or entry.name.startswith("temp_"):
+                    continue
+                name = os.path.splitext(entry.name)[0]
+                if entry.is_symlink():
+                    target = os.path.realpath(entry.path)
+                    if os.path.dirname(target) == source_dir:
+                        aliases[name] = os.path.splitext(os.path.basename(target))[0]
+                        continue
+                if name in sources:
+                    duplicates.add(name)
+                    if entry.name.endswith(COMPRESSED_SVG_EXTENSION):
+                        continue
+                stat = entry.stat()
+                sources[name] = {
+                    "path": entry.path,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                }
+
+        if self.verbose:
+            for name in sorted(duplicates):
+                print(f"  警告: {name}{SVG_EXTENSION} と {name}{COMPRESSED_SVG_EXTENSION} が両方あります。{name}{SVG_EXTENSION} を使用します")
+        return sources, {name: target for name, target in aliases.items() if name not in sources}
+
+    def _assign_sheet(self):
+        sheets = self.index["sheets"]
+        for sheet_name in sorted(sheets):
+            if len(sheets[sheet_name]) < self.symbols_per_sheet:
+                return sheet_name
+        sheet_number = len(sheets)
+        while f"{self.sheet_prefix}_{sheet_number:03d}.svg" in sheets:
+            sheet_number += 1
+        sheet_name = f"{self.sheet_prefix}_{sheet_number:03d}.svg"
+        sheets[sheet_name] = []
+        return sheet_name
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.symbol")
+
+    def _write_sheet(self, sheet_name):
+        symbols = self.index["symbols"]
+        names = self.index["sheets"][sheet_name]
+        css_classes = {css_class: color for color, css_class in self.index["palette"].items()}
+        used_classes = sorted({css_class for name in names for css_class in symbols[name]["colors"]})
+        style = "".join(f".{css_class}{{fill:{css_classes[css_class]}}}" for css_class in used_classes)
+
+        sheet_path = os.path.join(self.sprite_dir, sheet_name)
+        temp_path = make_temp_path(sheet_path)
+        with open(temp_path, "w", encoding="utf-8") as sheet_file:
+            sheet_file.write(f'<svg xmlns="{SVG_NAMESPACE}" style="display:none">\n')
+            sheet_file.write(f"<defs><style>{style}</style></defs>\n")
+            for name in names:
+                with open(self._cache_path(name), "r", encoding="utf-8") as fragment_file:
+                    sheet_file.write(fragment_file.read())
+                sheet_file.write("\n")
+            sheet_file.write("</svg>\n")
+        os.replace(temp_path, sheet_path)
+
+    def _write_stylesheet(self):
+        rules = [f".{css_class}{{fill:{color}}}" for color, css_class in self.index["palette"].items()]
+        write_text_atomic(self.stylesheet_path, "\n".join(rules) + "\n")
+
+    def _remove_outputs(self):
+        for entry in os.scandir(self.sprite_dir):
+            if entry.is_file() and entry.name.startswith(self.sheet_prefix):
+                os.remove(entry.path)
+        for entry in os.scandir(self.cache_dir):
+            os.remove(entry.path)
+
+    def build(self, rebuild=False):
+        timer = ProcessingTimer()
+        timer.start()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if rebuild:
+            self._remove_outputs()
+        else:
+            self._load_index()
+
+        symbols = self.index["symbols"]
+        sheets = self.index["sheets"]
+        palette = self.index["palette"]
+        palette_size = len(palette)
+        sources, aliases = self._scan_sources()
+        dirty_sheets = set()
+
+        for name in [name for name in symbols if name not in sources]:
+            sheet_name = symbols.pop(name)["sheet"]
+            sheets[sheet_name].remove(name)
+            dirty_sheets.add(sheet_name)
+            if os.path.exists(self._cache_path(name)):
+                os.remove(self._cache_path(name))
+
+        updated_count = 0
+        for name in sorted(sources):
+            source = sources[name]
+            entry = symbols.get(name)
+            cached = os.path.exists(self._cache_path(name))
+            if entry and cached and entry["size"] == source["size"] and entry["mtime"] == source["mtime"]:
+                continue
+
+            symbol_id = make_symbol_id(name)
+            try:
+                fragment, viewbox, colors = convert_svg_to_symbol(source["path"], symbol_id, palette)
+            except (ET.ParseError, OSError, EOFError) as e:
+                if self.verbose:
+                    print(f"  警告: SVGの解析に失敗しました: {os.path.basename(source['path'])} - {str(e)}")
+                if entry and not cached:
+                    sheets[entry["sheet"]].remove(name)
+                    del symbols[name]
+                    dirty_sheets.add(entry["sheet"])
+                continue
+
+            write_text_atomic(self._cache_path(name), fragment)
+            sheet_name = entry["sheet"] if entry else self._assign_sheet()
+            if not entry:
+                sheets[sheet_name].append(name)
+            symbols[name] = {
+                "id": symbol_id,
+                "sheet": sheet_name,
+                "viewBox": viewbox,
+                "colors": colors,
+                "size": source["size"],
+                "mtime": source["mtime"],
+            }
+            dirty_sheets.add(sheet_name)
+            updated_count += 1
+
+        for sheet_name in sorted(dirty_sheets):
+            if sheets[sheet_name]:
+                self._write_sheet(sheet_name)
+            else:
+                del sheets[sheet_name]
+                sheet_path = os.path.join(self.sprite_dir, sheet_name)
+                if os.path.exists(sheet_path):
+                    os.remove(sheet_path)
+
+        self.index["aliases"] = {name: target for name, target in sorted(aliases.items()) if target in symbols}
+
+        if len(palette) != palette_size or not os.path.exists(self.stylesheet_path):
+            self._write_stylesheet()
+        write_text_atomic(self.index_path, json.dumps(self.index, ensure_ascii=False, indent=2))
+
+        timer.stop()
+        if self.verbose:
+            print(f"スプライト生成: {len(symbols)}シンボル / {len(sheets)}シート / {len(palette)}色 / 別名{len(self.index['aliases'])}件")
+            print(f"  更新: {updated_count}シンボル, 再書き出し: {len(dirty_sheets)}シート ({timer.elapsed_formatted()})")
+            print(f"  出力先: {self.sprite_dir}")
+        return self.index
+
+def main():
+    parser = argparse.ArgumentParser(description="出力SVGからシンボルスプライトを生成")
+    parser.add_argument("--source-dir", default=OUTPUT_DIR,
+                       help="SVGファイルのフォルダ (デフォルト: output)")
+    parser.add_argument("--sprite-dir", default=SPRITE_CONFIG["output_dir"],
+                       help="スプライトの出力先フォルダ")
+    parser.add_argument("--symbols-per-sheet", type=int, default=SPRITE_CONFIG["symbols_per_sheet"],
+                       help="1シートあたりの最大シンボル数")
+    parser.add_argument("--rebuild", action="store_true",
+                       help="インデックスを破棄して全SVGから再生成")
+
+    args = parser.parse_args()
+
+    sprite_config = dict(SPRITE_CONFIG, output_dir=args.sprite_dir, symbols_per_sheet=args.symbols_per_sheet)
+    SpriteBuilder(args.source_dir, sprite_config).build(rebuild=args.rebuild)
+
+if __name__ == "__main__":
+    main()
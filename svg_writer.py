@@ -0,0 +1,89 @@
+import os
+import re
+import gzip
+
+from utils import make_temp_path
+
+SVG_EXTENSION = ".svg"
+COMPRESSED_SVG_EXTENSION = ".svgz"
+SVG_PATH_TAG = b"<path"
+SVG_HEADER_SIZE = 4096
+SVG_SIZE_PATTERN = re.compile(rb'width="\d+" height="\d+"')
+
+def get_svg_extension(svg_output_config):
+    return COMPRESSED_SVG_EXTENSION if svg_output_config["compress"] else SVG_EXTENSION
+
+def scan_svg_file(file_path, chunk_size):
+    svg_bytes = 0
+    path_count = 0
+    tail = b""
+    with open(file_path, "rb") as svg_file:
+        for chunk in iter(lambda: svg_file.read(chunk_size), b""):
+            svg_bytes += len(chunk)
+            window = tail + chunk
+            path_count += window.count(SVG_PATH_TAG)
+            tail = window[-(len(SVG_PATH_TAG) - 1):]
+    return svg_bytes, path_count
+
+def check_svg_limits(svg_bytes, path_count, limits):
+    if limits.max_svg_mb and svg_bytes > limits.max_svg_mb * 1024 * 1024:
+        return f"SVGサイズ {svg_bytes / (1024 * 1024):.1f}MB が上限 {limits.max_svg_mb}MB を超過"
+    if limits.max_svg_paths and path_count > limits.max_svg_paths:
+        return f"パス数 {path_count} が上限 {limits.max_svg_paths} を超過"
+    return None
+
+def place_on_canvas(svg_header, canvas_size, offset):
+    width, height = canvas_size
+    x, y = offset
+    return SVG_SIZE_PATTERN.sub(
+        f'width="{width}" height="{height}" viewBox="{-x} {-y} {width} {height}"'.encode("ascii"),
+        svg_header,
+        count=1
+    )
+
+class ByteCounter:
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return self.output_file.write(data)
+
+    def flush(self):
+        self.output_file.flush()
+
+def write_svg_stream(source_path, file_path, svg_output_config, canvas=None):
+    chunk_size = svg_output_config["chunk_size"]
+    temp_path = make_temp_path(file_path)
+    try:
+        with open(source_path, "rb") as source_file, open(temp_path, "wb") as raw_file:
+            counter = ByteCounter(raw_file)
+            if svg_output_config["compress"]:
+                output_file = gzip.GzipFile(
+                    filename="", mode="wb", fileobj=counter,
+                    compresslevel=svg_output_config["compression_level"], mtime=0
+                )
+            else:
+                output_file = counter
+
+            chunk = source_file.read(max(chunk_size, SVG_HEADER_SIZE))
+            if canvas:
+                chunk = place_on_canvas(chunk, *canvas)
+            while chunk:
+                output_file.write(chunk)
+                chunk = source_file.read(chunk_size)
+
+            if output_file is not counter:
+                output_file.close()
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return counter.written
+
+def open_svg(file_path):
+    if file_path.endswith(COMPRESSED_SVG_EXTENSION):
+        return gzip.open(file_path, "rb")
+    return open(file_path, "rb")
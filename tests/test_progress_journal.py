@@ -0,0 +1,51 @@
+import json
+
+from compiled_presets import get_compiled_preset
+from progress_journal import ProgressJournal
+
+PRESET = get_compiled_preset("draft")
+
+def make_result(input_path):
+    return {
+        "input_path": input_path,
+        "input_hash": "0" * 64,
+        "success": True,
+        "output_path": input_path + ".svg",
+        "elapsed": 1.0,
+    }
+
+def write_journal(journal_path, input_paths, resume=False):
+    journal = ProgressJournal(str(journal_path))
+    journal.open(resume=resume)
+    try:
+        for input_path in input_paths:
+            journal.record(make_result(input_path), PRESET)
+    finally:
+        journal.close()
+
+def load_paths(journal_path):
+    journal = ProgressJournal(str(journal_path))
+    journal.load()
+    return sorted(journal.entries)
+
+def test_resume_drops_record_truncated_inside_multibyte_character(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    write_journal(journal_path, ["画像1.png", "画像2.png"])
+
+    data = journal_path.read_bytes()
+    cut = data.rindex("画像2".encode("utf-8")) + 1
+    journal_path.write_bytes(data[:cut])
+    assert load_paths(journal_path) == ["画像1.png"]
+
+    write_journal(journal_path, ["画像3.png"], resume=True)
+
+    lines = journal_path.read_bytes().splitlines()
+    assert [json.loads(line)["input_path"] for line in lines] == ["画像1.png", "画像3.png"]
+
+def test_new_run_keeps_previous_journal(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    write_journal(journal_path, ["a.png"])
+    write_journal(journal_path, ["b.png"])
+
+    assert load_paths(journal_path) == ["b.png"]
+    assert load_paths(tmp_path / "journal.jsonl.1") == ["a.png"]
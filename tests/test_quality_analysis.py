@@ -0,0 +1,88 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from config import QUALITY_ANALYSIS_CONFIG
+from compiled_presets import get_compiled_preset
+from image_processor import (
+    get_image_processor,
+    create_analysis_thumbnail,
+    classify_level,
+    compute_laplacian_variance,
+    compute_histogram_contrast,
+)
+from batch_analyzer import analyze_directory, load_analysis_thumbnail, count_colors
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge", "images")
+SAMPLE_IMAGES = sorted(
+    os.path.join(SAMPLE_DIR, name) for name in os.listdir(SAMPLE_DIR)
+    if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".bmp"))
+)
+
+FULL_RESOLUTION_BLUR_THRESHOLDS = (100, 500)
+FULL_RESOLUTION_CONTRAST_THRESHOLDS = (50, 100)
+
+def full_resolution_levels(image):
+    gray = cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    contrast = cv2.calcHist([gray], [0], None, [256], [0, 256]).std()
+    return (
+        classify_level(sharpness, FULL_RESOLUTION_BLUR_THRESHOLDS),
+        classify_level(contrast, FULL_RESOLUTION_CONTRAST_THRESHOLDS),
+    )
+
+def test_thumbnail_keeps_aspect_ratio():
+    image = Image.new("RGB", (800, 200), "white")
+    gray = create_analysis_thumbnail(image, 256)
+    assert gray.shape == (64, 256)
+    assert image.size == (800, 200)
+
+@pytest.mark.parametrize("size", [(800, 200), (201, 1999), (257, 256), (1000, 3), (100, 80)])
+def test_thumbnail_size_matches_pillow_thumbnail(size):
+    image = Image.new("RGB", size)
+    expected = image.copy()
+    expected.thumbnail((256, 256))
+    assert create_analysis_thumbnail(image, 256).shape == (expected.height, expected.width)
+
+@pytest.mark.parametrize("image_path", SAMPLE_IMAGES, ids=os.path.basename)
+def test_thumbnail_levels_match_full_resolution(image_path):
+    with Image.open(image_path) as image:
+        image.load()
+        expected = full_resolution_levels(image)
+        analysis = get_image_processor(get_compiled_preset("standard")).analyze_image_quality(image)
+
+    assert (analysis["blur_level"], analysis["contrast_level"]) == expected
+
+def test_directory_analysis_matches_per_image_analysis():
+    processor = get_image_processor(get_compiled_preset("standard"))
+    records = analyze_directory(SAMPLE_IMAGES, QUALITY_ANALYSIS_CONFIG, verbose=False)
+
+    assert len(records) == len(SAMPLE_IMAGES)
+    for record in records:
+        with Image.open(record["input_path"]) as image:
+            image.load()
+            analysis = processor.analyze_image_quality(image)
+        assert record["blur_level"] == analysis["blur_level"]
+        assert record["contrast_level"] == analysis["contrast_level"]
+        assert record["sharpness"] == pytest.approx(analysis["sharpness"], rel=0.05)
+
+def test_padded_batch_matches_single_image_batches(tmp_path):
+    rng = np.random.default_rng(0)
+    image_paths = []
+    for index, size in enumerate([(900, 300), (200, 700), (120, 90), (256, 256)]):
+        pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        pixels[: size[1] // 2] //= 4
+        image_path = tmp_path / f"sample_{index}.png"
+        Image.fromarray(pixels).save(image_path)
+        image_paths.append(str(image_path))
+
+    records = analyze_directory(image_paths, dict(QUALITY_ANALYSIS_CONFIG, batch_size=len(image_paths)), verbose=False)
+
+    for record in records:
+        gray, rgb, original_size = load_analysis_thumbnail(record["input_path"], QUALITY_ANALYSIS_CONFIG["thumbnail_size"])
+        size = np.array([[gray.shape[1], gray.shape[0]]])
+        assert record["sharpness"] == pytest.approx(float(compute_laplacian_variance(gray)), rel=1e-5)
+        assert record["contrast"] == pytest.approx(float(compute_histogram_contrast(gray, original_size[0] * original_size[1])))
+        assert record["colors"] == count_colors(rgb[np.newaxis], size, QUALITY_ANALYSIS_CONFIG["color_bits"])[0]
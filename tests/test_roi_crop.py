@@ -0,0 +1,38 @@
+import re
+
+import pytest
+from PIL import Image
+
+from config import get_config_for_quality
+from engine import DEFAULT_ENGINE
+
+ENGINE = DEFAULT_ENGINE.with_stages(segment=lambda images, rembg_config, verbose=True: images)
+
+def make_input(tmp_path):
+    image = Image.new("RGBA", (400, 300), (0, 0, 0, 0))
+    image.paste((200, 40, 40, 255), (150, 100, 220, 160))
+    input_path = tmp_path / "subject.png"
+    image.save(input_path)
+    return str(input_path)
+
+def trace(input_path, tmp_path, quality, roi_crop):
+    config = get_config_for_quality(quality)
+    output_dir = tmp_path / f"{quality}_{roi_crop}"
+    output_dir.mkdir()
+    config["base_dirs"] = dict(config["base_dirs"], output=str(output_dir))
+    config["processing"] = dict(config["processing"], roi_crop=roi_crop, enable_quality_analysis=False)
+    result = ENGINE.convert_to_svg(input_path, config, verbose=False)
+    assert result["success"], result.get("error")
+    with open(result["output_path"], encoding="utf-8") as svg_file:
+        return svg_file.read()
+
+@pytest.mark.parametrize("quality", ["standard", "high"])
+def test_crop_matches_full_frame_with_preprocessing(tmp_path, quality):
+    input_path = make_input(tmp_path)
+    assert trace(input_path, tmp_path, quality, True) == trace(input_path, tmp_path, quality, False)
+
+def test_crop_keeps_canvas_without_preprocessing(tmp_path):
+    input_path = make_input(tmp_path)
+    cropped = trace(input_path, tmp_path, "draft", True)
+    assert re.search(r'width="400" height="300" viewBox="-\d+ -\d+ 400 300"', cropped)
+    assert "#000000" not in cropped
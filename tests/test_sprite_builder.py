@@ -0,0 +1,50 @@
+import os
+import gzip
+
+from sprite_builder import SpriteBuilder
+
+def make_svg(fill):
+    return f'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><path d="M0 0H5V5Z" fill="{fill}"/></svg>'
+
+def make_builder(tmp_path):
+    sprite_config = {"output_dir": str(tmp_path / "sprites"), "symbols_per_sheet": 10, "sheet_prefix": "sprite"}
+    return SpriteBuilder(str(tmp_path / "svg"), sprite_config, verbose=False)
+
+def read_sheet(tmp_path):
+    return (tmp_path / "sprites" / "sprite_000.svg").read_text(encoding="utf-8")
+
+def test_missing_cache_fragment_is_regenerated(tmp_path):
+    (tmp_path / "svg").mkdir()
+    (tmp_path / "svg" / "a.svg").write_text(make_svg("#FF0000"), encoding="utf-8")
+    (tmp_path / "svg" / "b.svg").write_text(make_svg("#00FF00"), encoding="utf-8")
+    make_builder(tmp_path).build()
+
+    os.remove(tmp_path / "sprites" / ".cache" / "a.symbol")
+    (tmp_path / "svg" / "b.svg").write_text(make_svg("#0000FF"), encoding="utf-8")
+    os.utime(tmp_path / "svg" / "b.svg", ns=(1, 1))
+    make_builder(tmp_path).build()
+
+    sheet = read_sheet(tmp_path)
+    assert 'id="a"' in sheet and 'id="b"' in sheet
+    assert (tmp_path / "sprites" / ".cache" / "a.symbol").exists()
+
+def test_svg_is_preferred_over_svgz_with_same_name(tmp_path):
+    (tmp_path / "svg").mkdir()
+    (tmp_path / "svg" / "icon.svgz").write_bytes(gzip.compress(make_svg("#00FF00").encode("utf-8")))
+    (tmp_path / "svg" / "icon.svg").write_text(make_svg("#FF0000"), encoding="utf-8")
+
+    index = make_builder(tmp_path).build()
+
+    assert list(index["symbols"]) == ["icon"]
+    assert list(index["palette"]) == ["#FF0000"]
+
+def test_symlinked_duplicates_are_recorded_as_aliases(tmp_path):
+    (tmp_path / "svg").mkdir()
+    (tmp_path / "svg" / "original.svg").write_text(make_svg("#FF0000"), encoding="utf-8")
+    os.symlink("original.svg", tmp_path / "svg" / "copy.svg")
+
+    index = make_builder(tmp_path).build()
+
+    assert list(index["symbols"]) == ["original"]
+    assert index["aliases"] == {"copy": "original"}
+    assert read_sheet(tmp_path).count("<symbol") == 1
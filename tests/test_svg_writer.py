@@ -0,0 +1,33 @@
+import gzip
+
+from svg_writer import scan_svg_file, write_svg_stream
+
+SVG_TEXT = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="40" height="30">\n'
+    + "".join(f'<path d="M{i} 0 L{i} 1Z" fill="#{i:06x}"/>\n' for i in range(50))
+    + "<!-- 日本語コメント -->\n</svg>\n"
+)
+
+def write_source(tmp_path):
+    source_path = tmp_path / "traced.svg"
+    source_path.write_bytes(SVG_TEXT.encode("utf-8"))
+    return source_path
+
+def test_scan_counts_bytes_and_paths_across_chunks(tmp_path):
+    source_path = write_source(tmp_path)
+    for chunk_size in (1, 3, 7, 64, 1 << 20):
+        assert scan_svg_file(source_path, chunk_size) == (len(SVG_TEXT.encode("utf-8")), 50)
+
+def test_write_stream_places_canvas_and_returns_bytes(tmp_path):
+    source_path = write_source(tmp_path)
+    output_path = tmp_path / "out.svgz"
+    svg_output_config = {"chunk_size": 16, "compress": True, "compression_level": 9}
+
+    written = write_svg_stream(source_path, str(output_path), svg_output_config, ((100, 80), (5, 7)))
+
+    assert written == output_path.stat().st_size
+    assert gzip.decompress(output_path.read_bytes()).decode("utf-8") == SVG_TEXT.replace(
+        'width="40" height="30"', 'width="100" height="80" viewBox="-5 -7 100 80"'
+    )
+    assert [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")] == []
@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+from utils import SCRATCH_DIR_PREFIX, clean_temp_files, make_scratch_dir, make_temp_path
+
+DEAD_PID = 2 ** 22 + 1
+
+def test_clean_removes_only_leftovers_of_dead_processes(tmp_path, monkeypatch):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    live_temp = make_temp_path(str(output_dir / "live.svg"))
+    dead_temp = str(output_dir / f"dead.svg.{DEAD_PID}.0123abcd.tmp")
+    for path in (live_temp, dead_temp, str(output_dir / "keep.svg")):
+        open(path, "wb").close()
+    live_scratch = make_scratch_dir()
+    dead_scratch = tmp_path / f"{SCRATCH_DIR_PREFIX}{DEAD_PID}_x"
+    dead_scratch.mkdir()
+    (dead_scratch / "tmp1234.png").write_bytes(b"png")
+
+    clean_temp_files(str(output_dir))
+
+    assert sorted(os.listdir(output_dir)) == sorted(["keep.svg", os.path.basename(live_temp)])
+    assert os.path.isdir(live_scratch)
+    assert not dead_scratch.exists()
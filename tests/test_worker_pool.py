@@ -0,0 +1,43 @@
+import os
+import time
+
+import pytest
+
+from worker_pool import SupervisedPool
+
+TASKS = ["first", "crash", "second", "hang", "third", "memory", "fourth"]
+
+def fake_convert(items, config, verbose, stage_callback=None):
+    for input_path, _ in items:
+        stage_callback("trace")
+        if input_path == "crash":
+            os._exit(3)
+        if input_path == "hang":
+            time.sleep(60)
+        if input_path == "memory":
+            held = bytearray(config["allocate_mb"] * 1024 * 1024)
+            time.sleep(60)
+        yield {"input_path": input_path, "success": True, "stage": "write"}
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_faulty_tasks_are_isolated_and_reported(batch_size):
+    pool = SupervisedPool(
+        fake_convert, {"allocate_mb": 256}, worker_count=1, timeout=1, max_rss_mb=128,
+        verbose=False, poll_interval=0.05, batch_size=batch_size, max_wait=0.5
+    )
+    results = []
+
+    pool.run(TASKS, results.append)
+
+    by_path = {result["input_path"]: result for result in results}
+    assert sorted(result["input_path"] for result in results) == sorted(TASKS)
+    assert {path: by_path[path].get("failure") for path in ("crash", "hang", "memory")} == {
+        "crash": "crashed", "hang": "timeout", "memory": "memory",
+    }
+    assert by_path["hang"]["stage"] == "trace"
+    assert all(by_path[path]["success"] for path in ("first", "second", "third", "fourth"))
+    if batch_size == 1:
+        assert pool.recycled_count == 3
+    else:
+        assert pool.recycled_count > 3
+    assert pool.workers == {}
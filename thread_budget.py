@@ -0,0 +1,35 @@
+import os
+import cv2
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+_current_threads = None
+
+def get_available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def compute_thread_budget(worker_count, total_threads=None):
+    if total_threads is None:
+        total_threads = get_available_cpus()
+    return max(1, total_threads // max(1, worker_count))
+
+def set_thread_environment(threads):
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+def apply_thread_budget(threads):
+    global _current_threads
+    set_thread_environment(threads)
+    cv2.setNumThreads(threads)
+    _current_threads = threads
+
+def get_thread_budget():
+    return _current_threads
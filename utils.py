@@ -1,7 +1,16 @@
 import os
+import re
 import time
+import json
+import uuid
+import shutil
+import hashlib
+import tempfile
 from pathlib import Path
 
+TEMP_FILE_PATTERN = re.compile(r"\.(\d+)\.[0-9a-f]{8}\.tmp$")
+SCRATCH_DIR_PREFIX = "svg_worker_"
+
 def format_file_size(size_bytes):
     if size_bytes == 0:
         return "0B"
@@ -26,16 +35,63 @@ def format_time(seconds):
         remaining_minutes = (seconds % 3600) // 60
         return f"{int(hours)}時間{int(remaining_minutes)}分"
 
-def get_file_info(file_path):
-    if not os.path.exists(file_path):
-        return None
-        
-    stat = os.stat(file_path)
-    return {
-        "size": stat.st_size,
-        "size_formatted": format_file_size(stat.st_size),
-        "modified": time.ctime(stat.st_mtime)
-    }
+def compute_data_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def compute_file_hash(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def make_temp_path(file_path):
+    return f"{file_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def make_scratch_dir():
+    return tempfile.mkdtemp(prefix=f"{SCRATCH_DIR_PREFIX}{os.getpid()}_")
+
+def remove_temp_files(directory, pid=None):
+    removed_count = 0
+    if not os.path.isdir(directory):
+        return removed_count
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            match = TEMP_FILE_PATTERN.search(entry.name)
+            if not match:
+                continue
+            owner_pid = int(match.group(1))
+            if owner_pid != pid and (pid is not None or is_process_alive(owner_pid)):
+                continue
+            try:
+                os.remove(entry.path)
+                removed_count += 1
+            except OSError as e:
+                print(f"警告: 一時ファイルの削除に失敗しました: {entry.name} - {str(e)}")
+    return removed_count
+
+def write_bytes_atomic(file_path, data):
+    temp_path = make_temp_path(file_path)
+    try:
+        with open(temp_path, "wb") as output_file:
+            output_file.write(data)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_text_atomic(file_path, text):
+    write_bytes_atomic(file_path, text.encode("utf-8"))
 
 def create_progress_bar(current, total, width=40):
     if total == 0:
@@ -48,22 +104,140 @@ def create_progress_bar(current, total, width=40):
     
     return f"[{bar}] {percentage:.1f}%"
 
-def print_processing_summary(processed_files, total_files, total_time, output_dir):
+TIME_HISTOGRAM_BUCKETS = [1, 5, 15, 60, 300]
+SIZE_HISTOGRAM_BUCKETS = [10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+
+def build_histogram(values, buckets, formatter):
+    counts = [0] * (len(buckets) + 1)
+    for value in values:
+        index = 0
+        while index < len(buckets) and value >= buckets[index]:
+            index += 1
+        counts[index] += 1
+    
+    labels = [f"< {formatter(buckets[0])}"]
+    labels += [f"{formatter(low)} - {formatter(high)}" for low, high in zip(buckets, buckets[1:])]
+    labels.append(f">= {formatter(buckets[-1])}")
+    return list(zip(labels, counts))
+
+def build_processing_summary(results, total_time, top_n=5):
+    succeeded = [result for result in results if result["success"]]
+    failed = [result for result in results if not result["success"]]
+    total_files = len(results)
+    
+    input_total = sum(result.get("input_size") or 0 for result in succeeded)
+    output_total = sum(result.get("output_size") or 0 for result in succeeded)
+    
+    fallback_counts = {}
+    for result in succeeded:
+        if result.get("fallback_preset"):
+            fallback_counts[result["fallback_preset"]] = fallback_counts.get(result["fallback_preset"], 0) + 1
+    
+    failure_counts = {}
+    for result in failed:
+        key = f"{result.get('failure', 'error')}@{result.get('stage')}"
+        failure_counts[key] = failure_counts.get(key, 0) + 1
+    
+    def brief(result):
+        return {
+            "input_path": result["input_path"],
+            "output_path": result.get("output_path"),
+            "elapsed": round(result["elapsed"], 3),
+            "input_size": result.get("input_size"),
+            "output_size": result.get("output_size"),
+        }
+    
+    return {
+        "total_files": total_files,
+        "succeeded": len(succeeded),
+        "failed": len(failed),
+        "success_rate": len(succeeded) / total_files * 100 if total_files > 0 else 0,
+        "total_time": total_time,
+        "average_time": total_time / total_files if total_files > 0 else 0,
+        "input_bytes": input_total,
+        "output_bytes": output_total,
+        "compression_ratio": (1 - output_total / input_total) * 100 if input_total > 0 else 0,
+        "time_histogram": build_histogram(
+            [result["elapsed"] for result in results], TIME_HISTOGRAM_BUCKETS, format_time
+        ),
+        "size_histogram": build_histogram(
+            [result.get("output_size") or 0 for result in succeeded], SIZE_HISTOGRAM_BUCKETS, format_file_size
+        ),
+        "slowest": [brief(result) for result in sorted(results, key=lambda result: result["elapsed"], reverse=True)[:top_n]],
+        "largest": [brief(result) for result in sorted(succeeded, key=lambda result: result.get("output_size") or 0, reverse=True)[:top_n]],
+        "fallback_counts": fallback_counts,
+        "failure_counts": failure_counts,
+        "failures": [
+            {
+                "input_path": result["input_path"],
+                "failure": result.get("failure", "error"),
+                "stage": result.get("stage"),
+                "error": result.get("error"),
+            }
+            for result in failed
+        ],
+    }
+
+def _print_histogram(title, histogram, width=30):
+    print(f"\n{title}:")
+    peak = max((count for _, count in histogram), default=0)
+    label_width = max(len(label) for label, _ in histogram)
+    for label, count in histogram:
+        bar = "#" * (int(width * count / peak) if peak > 0 else 0)
+        print(f"  {label:<{label_width}} {count:>6} {bar}")
+
+def print_processing_summary(summary, output_dir, max_failures=10):
     print(f"\n{'='*50}")
     print(f"処理結果サマリー")
     print(f"{'='*50}")
-    print(f"処理済みファイル: {processed_files}/{total_files}")
-    print(f"成功率: {(processed_files/total_files)*100:.1f}%")
-    print(f"総処理時間: {format_time(total_time)}")
-    print(f"平均処理時間: {format_time(total_time/total_files if total_files > 0 else 0)}")
+    print(f"処理済みファイル: {summary['succeeded']}/{summary['total_files']}")
+    print(f"成功率: {summary['success_rate']:.1f}%")
+    print(f"総処理時間: {format_time(summary['total_time'])}")
+    print(f"平均処理時間: {format_time(summary['average_time'])}")
     print(f"出力先: {output_dir}")
     
-    if processed_files > 0:
-        print(f"\n出力ファイル:")
-        for svg_file in Path(output_dir).glob("*.svg"):
-            info = get_file_info(svg_file)
-            if info:
-                print(f"  {svg_file.name}: {info['size_formatted']}")
+    if summary["succeeded"] > 0:
+        print(f"合計サイズ: {format_file_size(summary['input_bytes'])} → {format_file_size(summary['output_bytes'])} ({summary['compression_ratio']:.1f}%削減)")
+        _print_histogram("処理時間の分布", summary["time_histogram"])
+        _print_histogram("出力サイズの分布", summary["size_histogram"])
+        
+        print(f"\n処理時間の長いファイル:")
+        for entry in summary["slowest"]:
+            print(f"  {os.path.basename(entry['input_path'])}: {format_time(entry['elapsed'])}")
+        
+        print(f"\nサイズの大きい出力:")
+        for entry in summary["largest"]:
+            print(f"  {os.path.basename(entry['output_path'])}: {format_file_size(entry['output_size'])}")
+        
+        if summary["fallback_counts"]:
+            print(f"\nSVG上限超過により再トレース:")
+            for preset_name, count in sorted(summary["fallback_counts"].items()):
+                print(f"  {preset_name}: {count}件")
+    
+    if summary["failed"] > 0:
+        print(f"\n失敗: {summary['failed']}件")
+        for key, count in sorted(summary["failure_counts"].items(), key=lambda item: -item[1]):
+            failure, stage = key.split("@", 1)
+            print(f"  {failure} (段階: {stage}): {count}件")
+        for failure in summary["failures"][:max_failures]:
+            print(f"  {os.path.basename(failure['input_path'])}: {failure['error']}")
+        if summary["failed"] > max_failures:
+            print(f"  ...他{summary['failed'] - max_failures}件")
+
+def export_processing_summary(summary, results, json_path):
+    files = []
+    for result in results:
+        entry = {key: result.get(key) for key in (
+            "input_path", "output_path", "success", "stage", "elapsed", "input_size", "output_size",
+            "svg_paths", "fallback_preset", "analysis"
+        )}
+        if not result["success"]:
+            entry["failure"] = result.get("failure", "error")
+            entry["error"] = result.get("error")
+        files.append(entry)
+    
+    with open(json_path, "w", encoding="utf-8") as json_file:
+        json.dump(dict(summary, files=files), json_file, ensure_ascii=False, indent=2)
 
 def estimate_total_time(file_count, average_time_per_file):
     total_seconds = file_count * average_time_per_file
@@ -100,31 +274,29 @@ def create_output_directory(output_dir):
         return False, f"出力ディレクトリの作成に失敗しました: {str(e)}"
 
 def clean_temp_files(output_dir):
-    temp_files = list(Path(output_dir).glob("temp_*"))
-    cleaned_count = 0
+    cleaned_count = remove_temp_files(output_dir)
     
-    for temp_file in temp_files:
-        try:
-            temp_file.unlink()
-            cleaned_count += 1
-        except Exception as e:
-            print(f"警告: 一時ファイルの削除に失敗しました: {temp_file.name} - {str(e)}")
+    with os.scandir(tempfile.gettempdir()) as entries:
+        for entry in entries:
+            if not entry.name.startswith(SCRATCH_DIR_PREFIX) or not entry.is_dir():
+                continue
+            owner_pid = entry.name[len(SCRATCH_DIR_PREFIX):].split("_", 1)[0]
+            if owner_pid.isdigit() and not is_process_alive(int(owner_pid)):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                cleaned_count += 1
     
     if cleaned_count > 0:
         print(f"一時ファイル{cleaned_count}個を削除しました")
 
-def compare_file_sizes(input_file, output_file):
-    input_info = get_file_info(input_file)
-    output_info = get_file_info(output_file)
-    
-    if not input_info or not output_info:
+def compare_sizes(input_size, output_size):
+    if not input_size:
         return None
     
-    compression_ratio = (1 - (output_info["size"] / input_info["size"])) * 100
+    compression_ratio = (1 - (output_size / input_size)) * 100
     
     return {
-        "input_size": input_info["size_formatted"],
-        "output_size": output_info["size_formatted"],
+        "input_size": format_file_size(input_size),
+        "output_size": format_file_size(output_size),
         "compression_ratio": compression_ratio,
         "size_reduction": compression_ratio > 0
     }
@@ -0,0 +1,286 @@
+import os
+import time
+import queue
+import shutil
+import tempfile
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+from utils import make_scratch_dir, remove_temp_files
+
+def read_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+def _collect_batch(connection, first_task, batch_size, max_wait):
+    batch = [first_task]
+    if first_task[1]:
+        return batch, False
+
+    deadline = time.time() + max_wait
+    while len(batch) < batch_size:
+        remaining = deadline - time.time()
+        if remaining <= 0 or not connection.poll(remaining):
+            break
+        task = connection.recv()
+        if task is None:
+            return batch, True
+        batch.append(task)
+    return batch, False
+
+def _worker_main(connection, convert_func, config, verbose, initializer, initargs,
+                 batch_size, max_wait, scratch_dir):
+    tempfile.tempdir = scratch_dir
+    if initializer:
+        initializer(*initargs)
+
+    def report_stage(stage):
+        connection.send(("stage", stage))
+
+    stopping = False
+    while not stopping:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        batch, stopping = _collect_batch(connection, task, batch_size, max_wait)
+        items = [item for item, _ in batch]
+        connection.send(("batch", [input_path for input_path, _ in items]))
+        for result in convert_func(items, config, verbose, stage_callback=report_stage):
+            connection.send(("result", result))
+
+class SupervisedPool:
+    def __init__(self, convert_func, config, worker_count=1, timeout=None,
+                 max_rss_mb=None, verbose=True, poll_interval=0.5,
+                 initializer=None, initargs=(), batch_size=1, max_wait=0.0, temp_dirs=()):
+        self.convert_func = convert_func
+        self.config = config
+        self.worker_count = max(1, worker_count)
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.verbose = verbose
+        self.poll_interval = poll_interval
+        self.initializer = initializer
+        self.initargs = initargs
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.temp_dirs = list(temp_dirs)
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = {}
+        self.pending = deque()
+        self.feed = None
+        self.on_taken = None
+        self.recycled_count = 0
+
+    def _start_worker(self, worker_id):
+        parent_connection, child_connection = self.context.Pipe()
+        scratch_dir = make_scratch_dir()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(
+                child_connection, self.convert_func, self.config, self.verbose,
+                self.initializer, self.initargs, self.batch_size, self.max_wait, scratch_dir
+            ),
+            daemon=True
+        )
+        process.start()
+        child_connection.close()
+        self.workers[worker_id] = {
+            "process": process,
+            "connection": parent_connection,
+            "scratch_dir": scratch_dir,
+            "outstanding": [],
+            "active": [],
+            "isolated": False,
+            "stage": None,
+            "deadline": None,
+        }
+
+    def _stop_worker(self, worker_id, kill=False):
+        worker = self.workers.pop(worker_id)
+        if kill:
+            worker["process"].kill()
+        else:
+            try:
+                worker["connection"].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        worker["process"].join(timeout=5)
+        if worker["process"].is_alive():
+            kill = True
+            worker["process"].kill()
+            worker["process"].join()
+        worker["connection"].close()
+        shutil.rmtree(worker["scratch_dir"], ignore_errors=True)
+        if kill:
+            for temp_dir in self.temp_dirs:
+                remove_temp_files(temp_dir, worker["process"].pid)
+
+    def _recycle_worker(self, worker_id, reason, message):
+        worker = self.workers[worker_id]
+        stage = worker["stage"] if worker["active"] else "startup"
+        failed_paths = worker["active"] or [input_path for input_path, _ in worker["outstanding"]]
+        failed = [item for item in worker["outstanding"] if item[0] in failed_paths]
+        requeued = [item for item in worker["outstanding"] if item[0] not in failed_paths]
+
+        self._stop_worker(worker_id, kill=True)
+        self._start_worker(worker_id)
+        self.recycled_count += 1
+
+        self.pending.extendleft((item, False) for item in reversed(requeued))
+        if len(failed) > 1:
+            self.pending.extendleft((item, True) for item in reversed(failed))
+            if self.verbose:
+                print(f"  警告: バッチ処理中に{message} (段階: {stage})")
+                print(f"    ワーカーを再起動し、{len(failed)}件を1件ずつ再試行します")
+            return []
+
+        results = []
+        for input_path, _ in failed:
+            results.append({
+                "input_path": input_path,
+                "success": False,
+                "stage": stage,
+                "failure": reason,
+                "error": message,
+                "elapsed": self.timeout if reason == "timeout" else 0,
+            })
+            if self.verbose:
+                print(f"  エラー: {os.path.basename(input_path)} - {message} (段階: {stage})")
+                print(f"    ワーカーを再起動しました")
+        return results
+
+    def _check_limits(self, worker_id):
+        worker = self.workers[worker_id]
+        process = worker["process"]
+
+        if not process.is_alive():
+            return self._recycle_worker(
+                worker_id, "crashed", f"ワーカーが異常終了しました (終了コード: {process.exitcode})"
+            )
+
+        if not worker["active"]:
+            return []
+
+        if worker["deadline"] and time.time() > worker["deadline"]:
+            return self._recycle_worker(
+                worker_id, "timeout", f"タイムアウト ({self.timeout}秒) を超過しました"
+            )
+
+        if self.max_rss_bytes:
+            rss_bytes = read_rss_bytes(process.pid)
+            if rss_bytes is not None and rss_bytes > self.max_rss_bytes:
+                return self._recycle_worker(
+                    worker_id, "memory",
+                    f"メモリ上限 ({self.max_rss_bytes // (1024 * 1024)}MB) を超過しました"
+                )
+
+        return []
+
+    def _receive(self, worker_id):
+        worker = self.workers[worker_id]
+        try:
+            message_type, payload = worker["connection"].recv()
+        except (EOFError, OSError):
+            return self._check_limits(worker_id)
+
+        if message_type == "stage":
+            worker["stage"] = payload
+            return []
+
+        if message_type == "batch":
+            worker["active"] = list(payload)
+            worker["stage"] = "queued"
+            if self.timeout:
+                worker["deadline"] = time.time() + self.timeout * len(payload)
+            return []
+
+        input_path = payload["input_path"]
+        if input_path in worker["active"]:
+            worker["active"].remove(input_path)
+        worker["outstanding"] = [item for item in worker["outstanding"] if item[0] != input_path]
+        if not worker["active"]:
+            worker["deadline"] = None
+        if not worker["outstanding"]:
+            worker["isolated"] = False
+        return [payload]
+
+    def _take_from_feed(self):
+        while self.feed is not None and len(self.pending) < self.worker_count * self.batch_size:
+            try:
+                item = self.feed.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                self.feed = None
+                return
+            self.pending.append((item, False))
+            if self.on_taken:
+                self.on_taken()
+
+    def _dispatch(self):
+        self._take_from_feed()
+        results = []
+        for worker_id, worker in sorted(self.workers.items(), key=lambda entry: len(entry[1]["outstanding"])):
+            while self.pending and not worker["isolated"] and len(worker["outstanding"]) < self.batch_size:
+                item, isolate = self.pending[0]
+                if isolate and worker["outstanding"]:
+                    break
+                try:
+                    worker["connection"].send((item, isolate))
+                except (BrokenPipeError, OSError):
+                    results.extend(self._recycle_worker(
+                        worker_id, "crashed", f"ワーカーとの接続が切断されました (終了コード: {worker['process'].exitcode})"
+                    ))
+                    break
+                self.pending.popleft()
+                worker["outstanding"].append(item)
+                worker["isolated"] = isolate
+        return results
+
+    def run(self, tasks, on_result):
+        self.pending = deque(((task, None), False) for task in tasks)
+        self._run(on_result, min(self.worker_count, len(self.pending)))
+
+    def run_feed(self, feed, on_result, on_taken=None):
+        self.pending = deque()
+        self.feed = feed
+        self.on_taken = on_taken
+        self._run(on_result, self.worker_count)
+
+    def _run(self, on_result, worker_count):
+        for worker_id in range(worker_count):
+            self._start_worker(worker_id)
+
+        try:
+            while self.feed is not None or self.pending or any(worker["outstanding"] for worker in self.workers.values()):
+                for result in self._dispatch():
+                    on_result(result)
+
+                busy = {
+                    worker["connection"]: worker_id
+                    for worker_id, worker in self.workers.items() if worker["outstanding"]
+                }
+                timeout = self.poll_interval if self.feed is None else min(self.poll_interval, 0.05)
+                for connection in wait(list(busy), timeout=timeout):
+                    for result in self._receive(busy[connection]):
+                        on_result(result)
+
+                for worker_id in list(self.workers):
+                    if self.workers[worker_id]["outstanding"]:
+                        for result in self._check_limits(worker_id):
+                            on_result(result)
+        finally:
+            self.close()
+
+    def close(self):
+        for worker_id in list(self.workers):
+            self._stop_worker(worker_id, kill=bool(self.workers[worker_id]["outstanding"]))